@@ -2,43 +2,81 @@ from microbit import *
 
 BME280_I2C_ADDR = 0x76
 
+# register codes are the index into these tables
+BME280_OVERSAMPLING = (0, 1, 2, 4, 8, 16)
+BME280_IIR = (0, 2, 4, 8, 16)
+BME280_STANDBY_MS = (0.5, 62.5, 125, 250, 500, 1000, 10, 20)
+
+# altitude in cm for 30000-120000 Pa in 1000 Pa steps, built once at import
+_ALT_P0 = 30000
+_ALT_STEP = 1000
+_ALT_TABLE = tuple(int(4433000 * (1 - ((_ALT_P0 + i * _ALT_STEP) / 101325) ** (1 / 5.255))) for i in range(91))
+
+
+def altitude_cm(pa):
+    """
+
+    查表计算海拔高度，整数运算，误差小于 1M
+
+    Args:
+        pa (number): 气压 pa
+
+    Returns:
+        altitude 海拔高度 cm
+    """
+    i = (pa - _ALT_P0) // _ALT_STEP
+    if i < 0:
+        return _ALT_TABLE[0]
+    if i >= 90:
+        return _ALT_TABLE[90]
+    a = _ALT_TABLE[i]
+    return a + (_ALT_TABLE[i + 1] - a) * (pa - _ALT_P0 - i * _ALT_STEP) // _ALT_STEP
+
 
 class BME280():
-    def __init__(self):
+    def __init__(self, max_age_ms=0):
         """基本描述
 
         BME280温度, 湿度, 气压传感器
 
+        Args:
+            max_age_ms (number): 缓存有效时间 ms，此时间内重复读取直接使用上次的测量值，0 为每次都重新测量
+
         Returns:
             temperature 摄氏温度 humidity 湿度 0-100 pressure 气压 hPa altitude 海拔高度 M 根据气压换算
         """
-        self._T1 = self.__g2r(0x88)
-        self._T2 = self.__short(self.__g2r(0x8A))
-        self._T3 = self.__short(self.__g2r(0x8C))
-        self._P1 = self.__g2r(0x8E)
-        self._P2 = self.__short(self.__g2r(0x90))
-        self._P3 = self.__short(self.__g2r(0x92))
-        self._P4 = self.__short(self.__g2r(0x94))
-        self._P5 = self.__short(self.__g2r(0x96))
-        self._P6 = self.__short(self.__g2r(0x98))
-        self._P7 = self.__short(self.__g2r(0x9A))
-        self._P8 = self.__short(self.__g2r(0x9C))
-        self._P9 = self.__short(self.__g2r(0x9E))
-        self._H1 = self.__gr(0xA1)
-        self._H2 = self.__short(self.__g2r(0xE1))
-        self._H3 = self.__gr(0xE3)
-        a = self.__gr(0xE5)
-        self._H4 = (self.__gr(0xE4) << 4) + (a % 16)
-        self._H5 = (self.__gr(0xE6) << 4) + (a >> 4)
-        self._H6 = self.__gr(0xE7)
+        c = self.__read(0x88, 26)  # 0x88-0xA1
+        self._T1 = c[0] + c[1] * 256
+        self._T2 = self.__short(c[2] + c[3] * 256)
+        self._T3 = self.__short(c[4] + c[5] * 256)
+        self._P1 = c[6] + c[7] * 256
+        self._P2 = self.__short(c[8] + c[9] * 256)
+        self._P3 = self.__short(c[10] + c[11] * 256)
+        self._P4 = self.__short(c[12] + c[13] * 256)
+        self._P5 = self.__short(c[14] + c[15] * 256)
+        self._P6 = self.__short(c[16] + c[17] * 256)
+        self._P7 = self.__short(c[18] + c[19] * 256)
+        self._P8 = self.__short(c[20] + c[21] * 256)
+        self._P9 = self.__short(c[22] + c[23] * 256)
+        self._H1 = c[25]
+        c = self.__read(0xE1, 7)  # 0xE1-0xE7
+        self._H2 = self.__short(c[0] + c[1] * 256)
+        self._H3 = c[2]
+        self._H4 = (c[3] << 4) + (c[4] % 16)
+        self._H5 = (c[5] << 4) + (c[4] >> 4)
+        self._H6 = c[6]
         if self._H6 > 127:
             self._H6 -= 256
-        self.__sr(0xF2, 0x04)
-        self.__sr(0xF4, 0x2F)
-        self.__sr(0xF5, 0x0C)
+        self.__mode = 3  # normal mode
+        self.set_config()
         self.__T = 0
         self.__P = 0
+        self.__P64 = 0
         self._H = 0
+        self.__t_fine = 0
+        self.__adc_P = 0
+        self.__max_age = max_age_ms
+        self.__last = None
 
     def __short(self, dat):
         if dat > 32767:
@@ -50,26 +88,43 @@ class BME280():
     def __sr(self, reg, dat):
         i2c.write(BME280_I2C_ADDR, bytearray([reg, dat]))
 
-    # __get reg
-    def __gr(self, reg):
+    # burst read n regs starting at reg
+    def __read(self, reg, n):
         i2c.write(BME280_I2C_ADDR, bytearray([reg]))
-        t = i2c.read(BME280_I2C_ADDR, 1)
-        return t[0]
-
-    # __get two reg
-    def __g2r(self, reg):
-        i2c.write(BME280_I2C_ADDR, bytearray([reg]))
-        t = i2c.read(BME280_I2C_ADDR, 2)
-        return t[0] + t[1] * 256
+        return i2c.read(BME280_I2C_ADDR, n)
 
     def __get(self):
-        adc_T = (self.__gr(0xFA) << 12) + (self.__gr(0xFB) << 4) + \
-                (self.__gr(0xFC) >> 4)
+        d = self.__read(0xF7, 8)  # press, temp, hum in one burst
+        adc_P = (d[0] << 12) + (d[1] << 4) + (d[2] >> 4)
+        adc_T = (d[3] << 12) + (d[4] << 4) + (d[5] >> 4)
+        adc_H = (d[6] << 8) + d[7]
         var1 = (((adc_T >> 3) - (self._T1 << 1)) * self._T2) >> 11
         var2 = (((((adc_T >> 4) - self._T1) * ((adc_T >> 4) - self._T1)) >> 12)
                 * self._T3) >> 14
         t = var1 + var2
-        self.__T = ((t * 5 + 128) >> 8) / 100
+        self.__t_fine = t
+        self.__adc_P = adc_P
+        self.__T = (t * 5 + 128) >> 8
+        self.__P = None  # pressure is compensated on demand, once per sample
+        self.__P64 = None
+        var1 = t - 76800
+        var2 = (((adc_H << 14) - (self._H4 << 20) -
+                 (self._H5 * var1)) + 16384) >> 15
+        var1 = var2 * (((((((var1 * self._H6) >> 10) * (
+                ((var1 * self._H3) >> 11) + 32768)) >> 10) + 2097152) *
+                        self._H2 + 8192) >> 14)
+        var2 = var1 - (((((var1 >> 15) * (var1 >> 15)) >> 7) * self._H1) >> 4)
+        if var2 < 0:
+            var2 = 0
+        if var2 > 419430400:
+            var2 = 419430400
+        self._H = var2 >> 12
+
+    def __pressure(self):
+        # Bosch 32-bit integer compensation, result in Pa
+        if self.__P is not None:
+            return self.__P
+        t = self.__t_fine
         var1 = (t >> 1) - 64000
         var2 = (((var1 >> 2) * (var1 >> 2)) >> 11) * self._P6
         var2 = var2 + ((var1 * self._P5) << 1)
@@ -78,10 +133,8 @@ class BME280():
                 (((self._P2) * var1) >> 1)) >> 18
         var1 = ((32768 + var1) * self._P1) >> 15
         if var1 == 0:
-            return  # avoid exception caused by division by zero
-        adc_P = (self.__gr(0xF7) << 12) + (self.__gr(0xF8) << 4) + \
-                (self.__gr(0xF9) >> 4)
-        p = ((1048576 - adc_P) - (var2 >> 12)) * 3125
+            return 0  # avoid exception caused by division by zero
+        p = ((1048576 - self.__adc_P) - (var2 >> 12)) * 3125
         if p < 0x80000000:
             p = (p << 1) // var1
         else:
@@ -89,20 +142,69 @@ class BME280():
         var1 = (self._P9 * (((p >> 3) * (p >> 3)) >> 13)) >> 12
         var2 = ((p >> 2) * self._P8) >> 13
         self.__P = p + ((var1 + var2 + self._P7) >> 4)
-        adc_H = (self.__gr(0xFD) << 8) + self.__gr(0xFE)
-        var1 = t - 76800
-        var2 = (((adc_H << 14) - (self._H4 << 20) -
-                 (self._H5 * var1)) + 16384) >> 15
-        var1 = var2 * (((((((var1 * self._H6) >> 10) * (
-                ((var1 * self._H3) >> 11) + 32768)) >> 10) + 2097152) *
-                        self._H2 + 8192) >> 14)
-        var2 = var1 - (((((var1 >> 15) * (var1 >> 15)) >> 7) * self._H1) >> 4)
-        if var2 < 0:
-            var2 = 0
-        if var2 > 419430400:
-            var2 = 419430400
-        self._H = (var2 >> 12) / 1024
-        return [self.__T, self.__P, self._H]
+        return self.__P
+
+    def __sample(self):
+        now = running_time()
+        if self.__last is None or now - self.__last >= self.__max_age:
+            self.__get()
+            self.__last = now
+
+    def __altitude(self):
+        return 44330 * (1 - (self.__pressure() / 101325) ** (1 / 5.255))
+
+    def __pressure64(self):
+        # Bosch 64-bit integer compensation, result in Pa * 256
+        if self.__P64 is not None:
+            return self.__P64
+        var1 = self.__t_fine - 128000
+        var2 = var1 * var1 * self._P6
+        var2 = var2 + ((var1 * self._P5) << 17)
+        var2 = var2 + (self._P4 << 35)
+        var1 = ((var1 * var1 * self._P3) >> 8) + ((var1 * self._P2) << 12)
+        var1 = (((1 << 47) + var1) * self._P1) >> 33
+        if var1 == 0:
+            return 0
+        p = 1048576 - self.__adc_P
+        p = (((p << 31) - var2) * 3125) // var1
+        var1 = (self._P9 * (p >> 13) * (p >> 13)) >> 25
+        var2 = (self._P8 * p) >> 19
+        self.__P64 = ((p + var1 + var2) >> 8) + (self._P7 << 4)
+        return self.__P64
+
+    def read_all_int(self):
+        """
+
+        一次测量读取全部数值，全程整数运算，不使用浮点数
+
+        Returns:
+            (temperature, humidity, pressure, altitude) 温度 0.01C, 湿度 %/1024, 气压 pa*256, 海拔高度 cm
+        """
+        self.__sample()
+        p = self.__pressure64()
+        return self.__T, self._H, p, altitude_cm(p >> 8)
+
+    def set_max_age(self, ms):
+        """
+
+        设置缓存有效时间，此时间内的重复读取不再访问传感器
+
+        Args:
+            ms (number): 缓存有效时间 ms，0 为每次都重新测量
+
+        """
+        self.__max_age = ms
+
+    def read_all(self):
+        """
+
+        一次测量同时读取全部数值
+
+        Returns:
+            (temperature, humidity, pressure, altitude) 摄氏温度 C, 湿度 %, 气压 pa, 海拔高度 M
+        """
+        self.__sample()
+        return self.__T / 100, self._H / 1024, self.__pressure(), self.__altitude()
 
     # __get Temperature in Celsius ℃
     def get_temperature(self):
@@ -111,8 +213,8 @@ class BME280():
         读取摄氏温度 C
 
         """
-        self.__get()
-        return self.__T
+        self.__sample()
+        return self.__T / 100
 
     # __get Humidity in %RH
     def get_humidity(self):
@@ -121,8 +223,8 @@ class BME280():
         读取湿度 %
 
         """
-        self.__get()
-        return self._H
+        self.__sample()
+        return self._H / 1024
 
     # __get Pressure in Pa
     def get_pressure(self):
@@ -131,8 +233,8 @@ class BME280():
         读取气压 pa
 
         """
-        self.__get()
-        return self.__P
+        self.__sample()
+        return self.__pressure()
 
     # Calculating absolute altitude
     def get_altitude(self):
@@ -141,8 +243,86 @@ class BME280():
         读取海拔高度 M
 
         """
-        self.__get()
-        return 44330 * (1 - (self.__P / 101325) ** (1 / 5.255))
+        self.__sample()
+        return self.__altitude()
+
+    def set_config(self, osrs_t=1, osrs_p=4, osrs_h=8, iir=8, standby_ms=0.5):
+        """
+
+        设置过采样倍数、IIR 滤波系数和待机时间，过采样越低、滤波越小越省电但精度越低
+
+        Args:
+            osrs_t (number): 温度过采样 0(关闭),1,2,4,8,16
+            osrs_p (number): 气压过采样 0(关闭),1,2,4,8,16
+            osrs_h (number): 湿度过采样 0(关闭),1,2,4,8,16
+            iir (number): IIR 滤波系数 0(关闭),2,4,8,16
+            standby_ms (number): 连续模式两次测量间的待机时间 0.5,10,20,62.5,125,250,500,1000
+
+        """
+        self.__osrs_t = BME280_OVERSAMPLING.index(osrs_t)
+        self.__osrs_p = BME280_OVERSAMPLING.index(osrs_p)
+        self.__osrs_h = BME280_OVERSAMPLING.index(osrs_h)
+        self.__standby = standby_ms
+        mode = self.__mode
+        self.__mode = 0
+        self.__write_meas()  # config is only writable in sleep mode
+        self.__sr(0xF5, (BME280_STANDBY_MS.index(standby_ms) << 5) | (BME280_IIR.index(iir) << 2))
+        self.__sr(0xF2, self.__osrs_h)  # takes effect on the next ctrl_meas write
+        self.__mode = mode
+        self.__write_meas()
+
+    def __write_meas(self):
+        self.__sr(0xF4, (self.__osrs_t << 5) | (self.__osrs_p << 2) | self.__mode)
+
+    def get_measure_time(self):
+        """
+
+        按当前过采样设置估算一次测量的最长时间，连续模式的采样周期为此时间加待机时间
+
+        Returns:
+            time 测量时间 ms
+        """
+        t = 1250
+        for code, extra in ((self.__osrs_t, 0), (self.__osrs_p, 575), (self.__osrs_h, 575)):
+            if code:
+                t += 2300 * BME280_OVERSAMPLING[code] + extra
+        return (t + 999) // 1000
+
+    def get_sample_period(self):
+        """
+
+        连续模式下的采样周期
+
+        Returns:
+            period 采样周期 ms
+        """
+        return self.get_measure_time() + self.__standby
+
+    def set_trigger(self):
+        """
+
+        强制模式，触发单次测量后自动休眠，不阻塞；
+        get_measure_time() 毫秒后读取即为新数据
+
+        Returns:
+            time 测量时间 ms
+        """
+        self.__mode = 1
+        self.__write_meas()
+        self.__mode = 0  # the sensor returns to sleep by itself
+        self.__last = None
+        return self.get_measure_time()
+
+    def read_forced(self):
+        """
+
+        强制模式，触发单次测量并等待完成后读取全部数值，测量结束后模块自动休眠
+
+        Returns:
+            (temperature, humidity, pressure, altitude) 摄氏温度 C, 湿度 %, 气压 pa, 海拔高度 M
+        """
+        sleep(self.set_trigger())
+        return self.read_all()
 
     # normal mode
     def set_power_on(self):
@@ -151,7 +331,8 @@ class BME280():
         模块开始工作，实时监测环境变量
 
         """
-        self.__sr(0xF4, 0x2F)
+        self.__mode = 3
+        self.__write_meas()
 
     # sleep mode
     def set_power_off(self):
@@ -160,11 +341,13 @@ class BME280():
         模块休眠，保留最后一次检测的环境值，不会刷新
 
         """
-        self.__sr(0xF4, 0)
+        self.__mode = 0
+        self.__write_meas()
 
 
 if __name__ == '__main__':
     bme = BME280()
+    print("BME280_all:", bme.read_all())
     while True:
         print("BME280_temperature_C:", bme.get_temperature(), "C")
         print("BME280_humidity:", bme.get_humidity(), "%")
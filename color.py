@@ -10,6 +10,15 @@ class ColorList:
     yellow = "yellow"
     white = "white"
 
+# 默认色环范围，与 checkColor 一致，重叠部分按 checkColor 的判断顺序
+_HUE_NAMES = (None, ColorList.red, ColorList.green, ColorList.blue, ColorList.cyan,
+              ColorList.magenta, ColorList.yellow, ColorList.white)
+_HUE_LUT = bytearray(360)
+for _i, _lo, _hi in ((7, 180, 189), (6, 31, 119), (5, 261, 329), (4, 191, 209), (3, 211, 269),
+                     (2, 121, 179), (1, 331, 379)):
+    for _h in range(_lo, _hi + 1):
+        _HUE_LUT[_h % 360] = _i
+
 # APDS-9960 I2C地址及寄存器定义
 APDS9960_ADDR = 0x39
 APDS9960_ENABLE = 0x80
@@ -27,18 +36,124 @@ APDS9960_BDATAH = 0x9B
 APDS9960_GCONF4 = 0xAB
 APDS9960_AICLEAR = 0xE7
 
+APDS9960_INTEGRATION_MS = 6
+
 # TCS3472 I2C地址及寄存器定义
 TCS3472_ADDR = 0x43
+TCS3472_ATIME = 0x81
+TCS3472_ATIME_VALUE = 0xCA
+TCS3472_ENABLE = 0x80
+TCS3472_ENABLE_VALUE = 0x17
+TCS3472_STATUS = 0x93
+TCS3472_INTEGRATION_MS = 130
+
+APDS9960_ID = 0x92
+APDS9960_IDS = (0xAB, 0x9C, 0xA8)
+
+
+def _read_rgbc(addr, reg):
+    # one auto-increment burst for all four 16-bit channels
+    i2c.write(addr, bytearray([reg]))
+    buf = i2c.read(addr, 8)
+    return (buf[0] | buf[1] << 8, buf[2] | buf[3] << 8,
+            buf[4] | buf[5] << 8, buf[6] | buf[7] << 8)
+
+
+def _apds_setup():
+    for reg, value in ((APDS9960_ATIME, 0xFE), (APDS9960_CONTROL, 0x03), (APDS9960_ENABLE, 0x00),
+                       (APDS9960_GCONF4, 0x00), (APDS9960_AICLEAR, 0x00), (APDS9960_ENABLE, 0x01)):
+        i2c.write(APDS9960_ADDR, bytearray([reg, value]))
+
+
+def _apds_color_mode():
+    i2c.write(APDS9960_ADDR, bytearray([APDS9960_ENABLE]))
+    i2c.write(APDS9960_ADDR, bytearray([APDS9960_ENABLE, i2c.read(APDS9960_ADDR, 1)[0] | 0x2]))
+
+
+class _APDS9960:
+    integration_ms = APDS9960_INTEGRATION_MS
+    read_delay_ms = 0  # readColor polls AVALID straight away
+
+    def __init__(self):
+        _apds_setup()
+        _apds_color_mode()
+
+    def restart(self):
+        # toggling AEN clears AVALID and starts a new integration
+        i2c.write(APDS9960_ADDR, bytearray([APDS9960_ENABLE, 0x01]))
+        i2c.write(APDS9960_ADDR, bytearray([APDS9960_ENABLE, 0x03]))
+
+    def ready(self):
+        i2c.write(APDS9960_ADDR, bytearray([APDS9960_STATUS]))
+        return bool(i2c.read(APDS9960_ADDR, 1)[0] & 0x1)
+
+    def read(self):
+        c, r, g, b = _read_rgbc(APDS9960_ADDR, APDS9960_CDATAL)
+        return r, g, b, c
+
+    def adjust(self, hue):
+        return hue
+
+
+class _TCS3472:
+    integration_ms = TCS3472_INTEGRATION_MS
+    read_delay_ms = 100  # readColor keeps the original 100 ms wait
+
+    def __init__(self):
+        i2c.write(TCS3472_ADDR, bytearray([TCS3472_ATIME, TCS3472_ATIME_VALUE]))
+        i2c.write(TCS3472_ADDR, bytearray([TCS3472_ENABLE, TCS3472_ENABLE_VALUE]))
+        self.raw = (0, 0, 0, 0)
+
+    def restart(self):
+        # toggling AEN clears AVALID and starts a new integration
+        i2c.write(TCS3472_ADDR, bytearray([TCS3472_ENABLE, TCS3472_ENABLE_VALUE & ~0x02]))
+        i2c.write(TCS3472_ADDR, bytearray([TCS3472_ENABLE, TCS3472_ENABLE_VALUE]))
+
+    def verify(self):
+        # the chip at this address has no documented ID value, check that ATIME reads back
+        i2c.write(TCS3472_ADDR, bytearray([TCS3472_ATIME]))
+        return i2c.read(TCS3472_ADDR, 1)[0] == TCS3472_ATIME_VALUE
+
+    def ready(self):
+        i2c.write(TCS3472_ADDR, bytearray([TCS3472_STATUS]))
+        return bool(i2c.read(TCS3472_ADDR, 1)[0] & 0x1)
+
+    def read(self):
+        r, g, b, c = _read_rgbc(TCS3472_ADDR, 0xA0)
+
+        # channel gains scaled by 1024
+        r = r * 519 >> 10
+        g = g * 328 >> 10
+        b = b * 282 >> 10
+        c = c * 307 >> 10
+
+        if r > b and r > g:
+            b = b * 1208 >> 10
+            g = g * 973 >> 10
+
+        self.raw = (r, min(g, b), max(g, b), c)
+        return min(r, 4095), min(g, 4095), min(b, 4095), min(c, 4095)
+
+    def adjust(self, hue):
+        # bright cyan/white samples saturate, correct them from the clear channel
+        r, g, b, c = self.raw
+        if 180 <= hue <= 201 and c >= 6000 and ((b - g) < 1000 or (r > 4096 and g > 4096 and b > 4096)):
+            return 180 + (13000 - c * 13 // 15) // 1000
+        return hue
+
+
 class COLOR:
     """基本描述
 
-    APDS9960, 颜色距离手势传感器，本文件只做颜色识别使用
+    APDS9960 或 TCS3472 颜色传感器，构造时自动识别芯片，本文件只做颜色识别使用
 
     """
 
     def __init__(self):
-        self.color_first_init = False
-        self.color_new_init = False
+        self.color_ready_at = 0
+        self.color_rgbc = (0, 0, 0, 0)
+        self.color_table = {}
+        self.__detect()
 
     def i2c_write_color(self, addr, reg, value):
         buf = bytearray([reg, value])
@@ -74,111 +189,198 @@ class COLOR:
             Hue = (60 * ((R - G) * 100 / Delta) + 240 * 100) / 100
         return Hue
 
+    def __detect(self):
+        # probe once: the TCS3472 by reading back its config, the APDS9960 by its ID register
+        found = i2c.scan()
+        self.__dev = None
+        if TCS3472_ADDR in found:
+            dev = _TCS3472()
+            if dev.verify():
+                self.__dev = dev
+        if self.__dev is None:
+            if APDS9960_ADDR in found and self.i2c_read_color(APDS9960_ADDR, APDS9960_ID) in APDS9960_IDS:
+                self.__dev = _APDS9960()
+            else:
+                raise OSError('color sensor not found')
+        self.color_new_init = isinstance(self.__dev, _TCS3472)
+        self.color_first_init = not self.color_new_init
+
     def init_module(self):
-        global color_first_init
-        self.i2c_write_color(APDS9960_ADDR, APDS9960_ATIME, 0xFE)
-        self.i2c_write_color(APDS9960_ADDR, APDS9960_CONTROL, 0x03)
-        self.i2c_write_color(APDS9960_ADDR, APDS9960_ENABLE, 0x00)
-        self.i2c_write_color(APDS9960_ADDR, APDS9960_GCONF4, 0x00)
-        self.i2c_write_color(APDS9960_ADDR, APDS9960_AICLEAR, 0x00)
-        self.i2c_write_color(APDS9960_ADDR, APDS9960_ENABLE, 0x01)
+        """
+
+        初始化 APDS9960，构造时已自动完成，保留用于兼容
+
+        """
+        _apds_setup()
         self.color_first_init = True
 
     def colorMode(self):
-        tmp = self.i2c_read_color(APDS9960_ADDR, APDS9960_ENABLE) | 0x2
-        self.i2c_write_color(APDS9960_ADDR, APDS9960_ENABLE, tmp)
+        """
 
-    def readColor(self):
+        开启 APDS9960 颜色检测，构造时已自动完成，保留用于兼容
+
+        """
+        _apds_color_mode()
+
+    def get_integration_time(self):
+        """
+
+        当前芯片一次颜色采样的积分时间
+
+        Returns:
+            time 积分时间 ms
         """
+        return self.__dev.integration_ms
 
-        读取当前颜色HUE值
+    def start(self):
+        """
+
+        重新开始一次颜色积分，不阻塞，之后 poll_ready 为 True 时读到的一定是本次积分的数据
+
+        Returns:
+            time 距离数据就绪需要等待的时间 ms
+        """
+        self.__dev.restart()
+        t = self.__dev.integration_ms
+        self.color_ready_at = time.ticks_add(time.ticks_ms(), t)
+        return t
+
+    def poll_ready(self):
+        """
+
+        查询 start 开始的采样是否完成，不阻塞；芯片的 STATUS 一直未就绪时，
+        超过两倍积分时间后也返回 True，避免一直等待
+
+        Returns:
+            ready (bool): True 数据已就绪，可以调用 read
+        """
+        late = time.ticks_diff(time.ticks_ms(), self.color_ready_at)
+        if late < 0:
+            return False
+        return late > self.__dev.integration_ms or self.__dev.ready()
+
+    def hue_int(self, r, g, b):
+        """
+
+        整数运算计算 HUE 值，与 rgb2hsl 结果相同（取整），不使用浮点数
+
+        Returns:
+            hue HUE值 0-359
+        """
+        mx = max(r, g, b)
+        d = mx - min(r, g, b)
+        if d == 0:
+            return 0
+        if mx == r:
+            return (60 * (g - b) // d) % 360
+        if mx == g:
+            return 120 + 60 * (b - r) // d
+        return 240 + 60 * (r - g) // d
+
+    def read(self):
+        """
+
+        读取最近一次采样的颜色HUE值，一次总线传输读出全部通道，全程整数运算
 
         Returns:
             hue HUE颜色系统中的颜色,根据色环判断具体颜色
         """
-        c = 0
-        r = 0
-        g = 0
-        b = 0
-        temp_c = 0
-        temp_r = 0
-        temp_g = 0
-        temp_b = 0
-        temp = 0
-
-        if not self.color_first_init and not self.color_new_init:
-            i = 0
-            while i < 20:
-                try:
-                    i += 1
-                    buf = bytearray([0x81, 0xCA])
-                    i2c.write(TCS3472_ADDR, buf)
-                    buf = bytearray([0x80, 0x17])
-                    i2c.write(TCS3472_ADDR, buf)
-                    time.sleep_ms(50)
-        
-                    if (self.i2c_read_color(TCS3472_ADDR, 0xA4) + self.i2c_read_color(TCS3472_ADDR, 0xA5) * 256) != 0:
-                        self.color_new_init = True
-                        break
-                except:
-                    continue
-
-        if self.color_new_init:
-            time.sleep_ms(100)
-            c = self.i2c_read_color(TCS3472_ADDR, 0xA6) + self.i2c_read_color(TCS3472_ADDR, 0xA7) * 256
-            r = self.i2c_read_color(TCS3472_ADDR, 0xA0) + self.i2c_read_color(TCS3472_ADDR, 0xA1) * 256
-            g = self.i2c_read_color(TCS3472_ADDR, 0xA2) + self.i2c_read_color(TCS3472_ADDR, 0xA3) * 256
-            b = self.i2c_read_color(TCS3472_ADDR, 0xA4) + self.i2c_read_color(TCS3472_ADDR, 0xA5) * 256
-
-            r *= 0.50713
-            g *= 0.320712
-            b *= 0.27556
-            c *= 0.3
-
-            if r > b and r > g:
-                b *= 1.18
-                g *= 0.95
-
-            temp_c = c
-            temp_r = r
-            temp_g = g
-            temp_b = b
-
-            r = min(r, 4095.9356)
-            g = min(g, 4095.9356)
-            b = min(b, 4095.9356)
-            c = min(c, 4095.9356)
-
-            if temp_b < temp_g:
-                temp = temp_b
-                temp_b = temp_g
-                temp_g = temp
-
-        else:
-            if not self.color_first_init:
-                self.init_module()
-                self.colorMode()
-            tmp = self.i2c_read_color(APDS9960_ADDR, APDS9960_STATUS) & 0x1
-            while not tmp:
-                sleep(5)
-                tmp = self.i2c_read_color(APDS9960_ADDR, APDS9960_STATUS) & 0x1
-
-            c = self.i2c_read_color(APDS9960_ADDR, APDS9960_CDATAL) + self.i2c_read_color(APDS9960_ADDR, APDS9960_CDATAH) * 256
-            r = self.i2c_read_color(APDS9960_ADDR, APDS9960_RDATAL) + self.i2c_read_color(APDS9960_ADDR, APDS9960_RDATAH) * 256
-            g = self.i2c_read_color(APDS9960_ADDR, APDS9960_GDATAL) + self.i2c_read_color(APDS9960_ADDR, APDS9960_GDATAH) * 256
-            b = self.i2c_read_color(APDS9960_ADDR, APDS9960_BDATAL) + self.i2c_read_color(APDS9960_ADDR, APDS9960_BDATAH) * 256
-
-        avg = c / 3
-        r = r * 255 / avg
-        g = g * 255 / avg
-        b = b * 255 / avg
-        hue = self.rgb2hsl(r, g, b)
-
-        if self.color_new_init and hue >= 180 and hue <= 201 and temp_c >= 6000 and ((temp_b - temp_g) < 1000 or (temp_r > 4096 and temp_g > 4096 and temp_b > 4096)):
-            temp_c = temp_c / 15000 * 13000
-            hue = 180 + (13000 - temp_c) / 1000.0
+        r, g, b, c = self.__dev.read()
+        self.color_rgbc = (r, g, b, c)
+        return self.__dev.adjust(self.hue_int(r, g, b))
 
-        return hue
+    def __features(self, hue):
+        r, g, b, c = self.color_rgbc
+        mx = max(r, g, b)
+        sat = (mx - min(r, g, b)) * 255 // mx if mx else 0
+        return hue, sat
+
+    def classify(self):
+        """
+
+        读取一次并判断最接近的颜色；有 calibrate 校准数据时按校准数据匹配，否则按默认色环范围
+
+        Returns:
+            color 颜色名称，无法判断时为 None
+        """
+        hue, sat = self.__features(self.readColor())
+        if not self.color_table:
+            return _HUE_NAMES[_HUE_LUT[hue % 360]]
+        best, best_d = None, 0x7FFF
+        for label, v in self.color_table.items():
+            dh = abs(hue - (v[0] << 8 | v[1]))
+            dh = min(dh, 360 - dh)
+            # hue is unreliable on washed-out colors, weight it by saturation
+            d = dh * min(sat, v[2]) // 255 + abs(sat - v[2])
+            if d < best_d:
+                best, best_d = label, d
+        return best
+
+    def calibrate(self, label, samples=3):
+        """
+
+        把当前放在传感器前的颜色记录为参考样本，之后 classify 按参考样本匹配
+
+        Args:
+            label (str): 颜色名称
+            samples (number): 采样次数，取平均值
+
+        """
+        hue0 = hue_sum = sat_sum = 0
+        for i in range(samples):
+            hue, sat = self.__features(self.readColor())
+            if i == 0:
+                hue0 = hue
+            # unwrap around the first sample so red near 0/360 averages correctly
+            hue_sum += hue0 + (hue - hue0 + 180) % 360 - 180
+            sat_sum += sat
+        hue = (hue_sum // samples) % 360
+        self.color_table[label] = bytes([hue >> 8, hue & 0xFF, sat_sum // samples])
+
+    def get_color_table(self):
+        """
+
+        导出校准数据，可保存后用 set_color_table 恢复
+
+        Returns:
+            table (bytes): 每个颜色为 名称字节数+UTF-8 名称+3字节数据
+        """
+        out = b''
+        for k, v in self.color_table.items():
+            k = k.encode('utf-8')
+            out += bytes([len(k)]) + k + v
+        return out
+
+    def set_color_table(self, table):
+        """
+
+        导入 get_color_table 导出的校准数据，传入空值清除校准数据
+
+        Args:
+            table (bytes): 校准数据
+
+        """
+        self.color_table = {}
+        i = 0
+        while table and i < len(table):
+            n = table[i]
+            self.color_table[bytes(table[i + 1:i + 1 + n]).decode()] = bytes(table[i + 1 + n:i + 4 + n])
+            i += n + 4
+
+    def readColor(self):
+        """
+
+        读取当前颜色HUE值，芯片连续采样，不重新开始积分，
+        与原来相同：TCS3472 等待 100ms，APDS9960 等到数据有效后读取
+
+        Returns:
+            hue HUE颜色系统中的颜色,根据色环判断具体颜色
+        """
+        sleep(self.__dev.read_delay_ms)
+        self.color_ready_at = time.ticks_ms()
+        while not self.poll_ready():
+            sleep(1)
+        return self.read()
 
     def checkColor(self, color):
         hue = self.readColor()
@@ -227,4 +429,5 @@ if __name__ == '__main__':
         print("Detected HUE:", hue)
         is_red = color_sensor.checkColor(ColorList.red)
         print("Is Red:", is_red)
+        print("Color:", color_sensor.classify())
         sleep(1000)
\ No newline at end of file
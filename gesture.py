@@ -1,6 +1,7 @@
 from microbit import *
 
-initRegisterArray = [
+# PAJ7620U2 init sequence, (register, value) pairs; 0xEF selects the register bank
+initRegisterArray = bytes([
     0xEF, 0x00, 0x32, 0x29, 0x33, 0x01, 0x34, 0x00, 0x35, 0x01, 0x36, 0x00, 0x37, 0x07, 0x38, 0x17,
     0x39, 0x06, 0x3A, 0x12, 0x3F, 0x00, 0x40, 0x02, 0x41, 0xFF, 0x42, 0x01, 0x46, 0x2D, 0x47, 0x0F,
     0x48, 0x3C, 0x49, 0x00, 0x4A, 0x1E, 0x4B, 0x00, 0x4C, 0x20, 0x4D, 0x00, 0x4E, 0x1A, 0x4F, 0x14,
@@ -29,7 +30,12 @@ initRegisterArray = [
     0x67, 0x97, 0x68, 0x01, 0x69, 0xCD, 0x6A, 0x01, 0x6B, 0xB0, 0x6C, 0x04, 0x6D, 0x2C, 0x6E, 0x01,
     0x6F, 0x32, 0x71, 0x00, 0x72, 0x01, 0x73, 0x35, 0x74, 0x00, 0x75, 0x33, 0x76, 0x31, 0x77, 0x01,
     0x7C, 0x84, 0x7D, 0x03, 0x7E, 0x01
-]
+])
+
+# gesture flag bits of registers 0x43 (bit 0-7) and 0x44 (bit 8)
+GESTURE_NAMES = ("Right", "Left", "Up", "Down", "Forward", "Backward", "Clockwise", "Anticlockwise", "Wave")
+_FLAG_NAMES = {1 << i: GESTURE_NAMES[i] for i in range(8)}
+GESTURE_TICK_MS = 10
 
 
 class GESTURE(object):
@@ -39,9 +45,24 @@ class GESTURE(object):
 
     """
 
-    def __init__(self):
+    def __init__(self, verify=False):
+        """
+
+        Args:
+            verify (bool): 初始化后回读寄存器校验，结果保存在 init_errors
+
+        """
         i2c.init()
-        self.__initmodule()
+        self.init_errors = 0
+        t = running_time()
+        self.__initmodule(verify)
+        self.init_time_ms = running_time() - t
+        self.__sampling = False
+        self.__timer = False
+        self.__handlers = {}
+        self.__events = [None]
+        self.__head = 0
+        self.__count = 0
 
     def __i2cwrite_gesture(self, addr, reg):
         i2c.write(0x73, bytearray([addr, reg]))
@@ -57,48 +78,147 @@ class GESTURE(object):
         elif bank == 1:
             self.__i2cwrite_gesture(0xEF, 1)
 
-    def __initmodule(self):
+    def __runs(self):
+        # split the pairs into runs of consecutive registers, bank switches stand alone
+        arr = initRegisterArray
+        start = 0
+        for i in range(2, len(arr) + 2, 2):
+            if i == len(arr) or arr[i] != arr[i - 2] + 1 or arr[i] == 0xEF or arr[i - 2] == 0xEF:
+                yield arr[start], arr[start + 1:i:2]
+                start = i
+
+    def __initmodule(self, verify):
         self.__selectbank(0)
         temp = self.__i2cread_gesture(0)
         if temp == 0x20:
-            for i in range(0, 438, 2):
-                self.__i2cwrite_gesture(initRegisterArray[i], initRegisterArray[i+1])
+            for reg, data in self.__runs():
+                i2c.write(0x73, bytes([reg]) + data)
+            if verify:
+                for reg, data in self.__runs():
+                    if reg == 0xEF:
+                        self.__selectbank(data[0])
+                        continue
+                    i2c.write(0x73, bytearray([reg]))
+                    got = i2c.read(0x73, len(data))
+                    for i in range(len(data)):
+                        if got[i] != data[i]:
+                            self.init_errors += 1
         self.__selectbank(0)
 
+    def __read_flags(self):
+        i2c.write(0x73, bytearray([0x43]))
+        return i2c.read(0x73, 2)
+
     def get_gesture(self):
         """
 
-        读取当前手势值
+        读取当前手势值，后台采样开启时取出最早的一个手势事件
 
         Returns:
             读取当前手势值，字符串
         """
-        __tmp = self.__i2cread_gesture(0x43)
-        if __tmp == 0x01:
-            return "Right"
-        elif __tmp == 0x02:
-            return "Left"
-        elif __tmp == 0x04:
-            return "Up"
-        elif __tmp == 0x08:
-            return "Down"
-        elif __tmp == 0x10:
-            return "Forward"
-        elif __tmp == 0x20:
-            return "Backward"
-        elif __tmp == 0x40:
-            return "Clockwise"
-        elif __tmp == 0x80:
-            return "Anticlockwise"
-        else:
-            __tmp = self.__i2cread_gesture(0x44)
-            if __tmp == 0x01:
-                return "Wave"
+        if self.__sampling:
+            e = self.get_event()
+            return e[0] if e else "None"
+        buf = self.__read_flags()
+        name = _FLAG_NAMES.get(buf[0])
+        if name is not None:
+            return name
+        if buf[1] == 0x01:
+            return "Wave"
         return "None"
 
+    def start_sampling(self, ms=20, size=16):
+        """
+
+        开启后台采样，定时读取手势并存入事件队列，主程序不需要轮询传感器
+
+        Args:
+            ms (number): 采样间隔 ms，不小于 GESTURE_TICK_MS
+            size (number): 事件队列长度，至少为 1，满时丢弃最旧的事件
+
+        """
+        if size < 1:
+            raise ValueError('size error')
+        self.__events = [None] * size
+        self.__head = 0
+        self.__count = 0
+        self.__interval = ms
+        self.__last = running_time() - ms
+        self.__sampling = True
+        if not self.__timer:
+            run_every(self.__sample, ms=GESTURE_TICK_MS)
+            self.__timer = True
+
+    def stop_sampling(self):
+        """
+
+        停止后台采样，队列中的事件仍可用 get_event 取出
+
+        """
+        self.__sampling = False
+
+    def __sample(self):
+        if not self.__sampling:
+            return
+        now = running_time()
+        if now - self.__last < self.__interval:
+            return
+        self.__last = now
+        buf = self.__read_flags()
+        flags = buf[0] | (buf[1] & 0x01) << 8
+        if not flags:
+            return
+        for i in range(9):
+            if flags & (1 << i):
+                name = GESTURE_NAMES[i]
+                size = len(self.__events)
+                self.__events[(self.__head + self.__count) % size] = (name, now)
+                if self.__count < size:
+                    self.__count += 1
+                else:
+                    self.__head = (self.__head + 1) % size
+                handler = self.__handlers.get(name)
+                if handler:
+                    handler()
+
+    def get_event(self):
+        """
+
+        取出最早的一个手势事件
+
+        Returns:
+            (gesture, time) 手势字符串和发生时的 running_time() ms，队列为空时返回 None
+        """
+        if not self.__count:
+            return None
+        e = self.__events[self.__head]
+        self.__head = (self.__head + 1) % len(self.__events)
+        self.__count -= 1
+        return e
+
+    def on_gesture(self, gesture, handler):
+        """
+
+        注册手势回调函数，后台采样检测到该手势时调用，未开启后台采样时自动开启
+
+        Args:
+            gesture (str): 手势字符串，见 GESTURE_NAMES
+            handler: 回调函数，无参数，传入 None 取消注册
+
+        """
+        if handler is None:
+            self.__handlers.pop(gesture, None)
+            return
+        self.__handlers[gesture] = handler
+        if not self.__sampling:
+            self.start_sampling()
+
 
 if __name__ == '__main__':
     ges = GESTURE()
+    print("init time:", ges.init_time_ms, "ms")
+    ges.on_gesture("Wave", lambda: print("wave!"))
     while True:
-        print("get_gesture: ", ges.get_gesture())
-        sleep(5)
+        print("get_event: ", ges.get_event())
+        sleep(500)
@@ -8,6 +8,8 @@ HT16K33_BLINK_DISPLAYON = 0x01
 
 HT16K33_CMD_BRIGHTNESS = 0xE0
 
+ANIMATION_TICK_MS = 20
+
 
 class MATRIX(object):
     """基本描述
@@ -19,7 +21,11 @@ class MATRIX(object):
     def __init__(self):
         i2c.init()
         self.__initmodule()
-        self.__matBuf = [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0]
+        self.__matBuf = bytearray(17)  # [0] is the display RAM start address
+        self.__buffered = False
+        self.__prev = []
+        self.__anim = None
+        self.__anim_timer = False
 
     def __i2cwrite_matrix(self, addr, reg):
         i2c.write(addr, bytearray([reg]))
@@ -30,12 +36,39 @@ class MATRIX(object):
         self.__i2cwrite_matrix(HT16K33_ADDRESS, HT16K33_CMD_BRIGHTNESS | 0xF)
 
     def __matrix_show(self):
+        if not self.__buffered:
+            self.show()
+
+    def __enter__(self):
+        self.__prev.append(self.__buffered)
+        self.__buffered = True
+        return self
+
+    def __exit__(self, *args):
+        self.__buffered = self.__prev.pop()
+        self.__matrix_show()
+
+    def set_buffered(self, on=True):
+        """
+
+        缓冲模式，开启后绘图只修改显存，调用 show 时一次性写入
+        也可以使用 with 语句: with dis: ... 结束时自动显示
+
+        Args:
+            on (bool): True 开启 False 关闭，关闭时自动显示
+
+        """
+        self.__buffered = on
+        self.__matrix_show()
+
+    def show(self):
+        """
+
+        将显存一次性写入点阵显示屏
+
+        """
         self.__matBuf[0] = 0x00
-        i2c.write(HT16K33_ADDRESS, bytearray([
-            self.__matBuf[0], self.__matBuf[1], self.__matBuf[2], self.__matBuf[3], self.__matBuf[4], self.__matBuf[5],
-            self.__matBuf[6], self.__matBuf[7], self.__matBuf[8], self.__matBuf[9], self.__matBuf[10],
-            self.__matBuf[11],
-            self.__matBuf[12], self.__matBuf[13], self.__matBuf[14], self.__matBuf[15], self.__matBuf[16]]))
+        i2c.write(HT16K33_ADDRESS, self.__matBuf)
 
     def set_matrix_clear(self):
         """
@@ -43,7 +76,7 @@ class MATRIX(object):
         清空点阵显示屏
 
         """
-        for i in range(17):
+        for i in range(1, 17):
             self.__matBuf[i] = 0
         self.__matrix_show()
 
@@ -65,63 +98,133 @@ class MATRIX(object):
         self.__matBuf[idx + 1] = tmp
         self.__matrix_show()
 
+    def set_matrix_bitmap(self, bitmap):
+        """
+
+        显示一帧 16 字节点阵位图
+
+        Args:
+            bitmap (bytes): 每行 2 字节，共 8 行，可由 compile_sprite 生成
+
+        Returns:
+            NONE
+        """
+        self.__matBuf[1:17] = bitmap
+        self.__matrix_show()
+
     def set_matrix_expression(self, expression):
         """
 
         显示一个emoji表情
 
         Args:
-            expression (str): 表情，字符串
+            expression (str): 表情，字符串，内置 Neutral Sad Smile Angry 或 register_expression 注册的名字
+
+        Returns:
+            NONE
+        """
+        if expression not in EXPRESSIONS:
+            raise ValueError('expression error')
+        self.set_matrix_bitmap(EXPRESSIONS[expression])
+
+    def register_expression(self, name, sprite):
+        """
+
+        注册一个新的表情或图案
+
+        Args:
+            name (str): 表情名字
+            sprite (list/bytes): 点坐标列表 [[x, y], ...] 或 16 字节位图
+
+        Returns:
+            NONE
+        """
+        EXPRESSIONS[name] = sprite if isinstance(sprite, bytes) else compile_sprite(sprite)
+
+    def set_matrix_animation(self, frames, ms=200, loop=True):
+        """
+
+        后台循环播放动画，不阻塞主程序
+
+        Args:
+            frames (list): 帧列表，每帧为表情名字或 16 字节位图
+            ms (number): 每帧显示时间 ms
+            loop (bool): True 循环播放 False 播放一次后停在最后一帧
 
         Returns:
             NONE
         """
-        if expression == "Neutral":
-            point = [[2, 1], [3, 1], [13, 1], [12, 1],
-                     [2, 2], [3, 2], [13, 2], [12, 2],
-                     [2, 3], [3, 3], [13, 3], [12, 3],
-                     [5, 5], [6, 5], [7, 5], [8, 5], [9, 5], [10, 5],
-                     [5, 6], [6, 6], [7, 6], [8, 6], [9, 6], [10, 6]
-                     ]
-        elif expression == "Sad":
-            point = [[1, 2], [5, 2], [10, 2], [14, 2],
-                     [1, 3], [2, 3], [3, 3], [4, 3], [5, 3], [10, 3], [11, 3], [12, 3], [13, 3], [14, 3],
-                     [2, 4], [3, 4], [4, 4], [11, 4], [12, 4], [13, 4],
-                     [6, 6], [7, 6], [8, 6], [9, 6],
-                     [5, 7], [10, 7]
-                     ]
-        elif expression == "Smile":
-            point = [[2, 1], [3, 1], [13, 1], [12, 1],
-                     [2, 2], [3, 2], [13, 2], [12, 2],
-                     [2, 3], [3, 3], [13, 3], [12, 3],
-                     [5, 5], [10, 5],
-                     [6, 6], [7, 6], [8, 6], [9, 6]
-                     ]
-        elif expression == "Angry":
-            point = [[2, 0], [13, 0],
-                     [3, 1], [12, 1],
-                     [3, 2], [4, 2], [11, 2], [12, 2],
-                     [3, 3], [4, 3], [11, 3], [12, 3],
-                     [6, 6], [7, 6], [8, 6], [9, 6],
-                     [5, 7], [10, 7]
-                     ]
-        else:
-            pass
-        self.set_matrix_clear()
-        for i in range(len(point)):
-            self.set_matrix_draw(point[i][0], point[i][1])
+        self.__anim = tuple(EXPRESSIONS[f] if isinstance(f, str) else f for f in frames)
+        self.__anim_ms = ms
+        self.__anim_loop = loop
+        self.__anim_idx = 0
+        self.__anim_last = running_time() - ms
+        if not self.__anim_timer:
+            run_every(self.__animation_step, ms=ANIMATION_TICK_MS)
+            self.__anim_timer = True
+
+    def set_matrix_animation_stop(self):
+        """
+
+        停止播放动画，保留当前帧
+
+        """
+        self.__anim = None
+
+    def __animation_step(self):
+        anim = self.__anim
+        if anim is None:
+            return
+        now = running_time()
+        if now - self.__anim_last < self.__anim_ms:
+            return
+        self.__anim_last = now
+        self.set_matrix_bitmap(anim[self.__anim_idx])
+        self.__anim_idx += 1
+        if self.__anim_idx >= len(anim):
+            if self.__anim_loop:
+                self.__anim_idx = 0
+            else:
+                self.__anim = None
+
+
+def compile_sprite(points):
+    """
+
+    把点坐标列表编译为 16 字节点阵位图
+
+    Args:
+        points (list): 点坐标列表 [[x, y], ...], x 0-15, y 0-7
+
+    Returns:
+        bitmap (bytes): 16 字节位图
+    """
+    buf = bytearray(16)
+    for x, y in points:
+        buf[y * 2 + x // 8] |= 1 << (x % 8)
+    return bytes(buf)
+
+
+EXPRESSIONS = {
+    "Neutral": b'\x00\x00\x0c\x30\x0c\x30\x0c\x30\x00\x00\xe0\x07\xe0\x07\x00\x00',
+    "Sad": b'\x00\x00\x00\x00\x22\x44\x3e\x7c\x1c\x38\x00\x00\xc0\x03\x20\x04',
+    "Smile": b'\x00\x00\x0c\x30\x0c\x30\x0c\x30\x00\x00\x20\x04\xc0\x03\x00\x00',
+    "Angry": b'\x04\x20\x08\x10\x18\x18\x18\x18\x00\x00\x00\x00\xc0\x03\x20\x04',
+}
 
 
 if __name__ == '__main__':
     dis = MATRIX()
     x, y = 0, 0
 
-    for y in range(8):
-        for x in range(16):
-            dis.set_matrix_draw(x, y)
+    with dis:
+        for y in range(8):
+            for x in range(16):
+                dis.set_matrix_draw(x, y)
     dis.set_matrix_clear()
     dis.set_matrix_expression("Angry")
     sleep(500)
     dis.set_matrix_expression("Sad")
     sleep(500)
     dis.set_matrix_expression("Smile")
+    dis.set_matrix_animation(["Neutral", "Smile"], 500)
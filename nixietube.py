@@ -7,6 +7,17 @@ TM1637_CMD3 = 128  # 0x80 display control command
 
 _SEGMENTS = (0x3F, 0x06, 0x5B, 0x4F, 0x66, 0x6D, 0x7D, 0x07, 0x7F, 0x6F, 0x77, 0x7C, 0x39, 0x5E, 0x79, 0x71)
 
+# ASCII -> segment code, characters that cannot be drawn stay blank
+_ASCII = bytearray(128)
+for _i in range(10):
+    _ASCII[48 + _i] = _SEGMENTS[_i]
+for _c, _v in zip('AbCdEFGHIJLnoPqrStUyZ', (0x77, 0x7C, 0x39, 0x5E, 0x79, 0x71, 0x3D, 0x76, 0x06, 0x1E, 0x38, 0x54,
+                                          0x5C, 0x73, 0x67, 0x50, 0x6D, 0x78, 0x3E, 0x6E, 0x5B)):
+    _ASCII[ord(_c.upper())] = _v
+    _ASCII[ord(_c.lower())] = _v
+for _c, _v in zip('chuO-_=\'"[]', (0x58, 0x74, 0x1C, 0x3F, 0x40, 0x08, 0x48, 0x20, 0x22, 0x39, 0x0F)):
+    _ASCII[ord(_c)] = _v
+
 
 class NIXIETUBE(object):
     """基本描述
@@ -32,12 +43,14 @@ class NIXIETUBE(object):
         self.__intensity = intensity % 8
         self.__LED = number
         self.__ON = 8
-        self.__buf_d = [0, 0, 0, 0]
+        self.__buf_d = bytearray(number)  # frame to display
+        self.__sent = bytearray(number)  # frame last sent to the tube
 
         self.__clk.write_digital(0)
         self.__dio.write_digital(0)
 
         self.set_clear()
+        self.__write_dsp_ctrl()
 
     def __start(self):
         self.__dio.write_digital(0)
@@ -66,13 +79,24 @@ class NIXIETUBE(object):
         self.__clk.write_digital(1)
         self.__clk.write_digital(0)
 
-    def __dat(self, bit, dat):
+    def __show_frame(self, force=False):
+        # send only the changed digit range, using address auto-increment
+        frame, sent = self.__buf_d, self.__sent
+        lo, hi = 0, self.__LED - 1
+        if not force:
+            while lo <= hi and frame[lo] == sent[lo]:
+                lo += 1
+            while hi >= lo and frame[hi] == sent[hi]:
+                hi -= 1
+            if lo > hi:
+                return
         self.__write_data_cmd()
         self.__start()
-        self.__write_byte(TM1637_CMD2 | (bit % self.__LED))
-        self.__write_byte(dat)
+        self.__write_byte(TM1637_CMD2 | lo)
+        for i in range(lo, hi + 1):
+            self.__write_byte(frame[i])
+            sent[i] = frame[i]
         self.__stop()
-        self.__write_dsp_ctrl()
 
     def set_power_on(self):
         """
@@ -121,11 +145,22 @@ class NIXIETUBE(object):
         清空数码管显示内容
 
         """
-        self.__dat(0, 0)
-        self.__dat(1, 0)
-        self.__dat(2, 0)
-        self.__dat(3, 0)
-        self.__buf_d = [0, 0, 0, 0]
+        for i in range(self.__LED):
+            self.__buf_d[i] = 0
+        self.__show_frame(True)
+
+    def set_show_segments(self, segments):
+        """
+
+        一次性显示所有位的段码，只发送有变化的位
+
+        Args:
+            segments (bytes): 每位一个段码字节，bit0-bit6 为 a-g 段，bit7 为小数点
+
+        """
+        for i in range(self.__LED):
+            self.__buf_d[i] = segments[i]
+        self.__show_frame()
 
     def set_show_bit(self, num, bit=0):
         """
@@ -138,7 +173,84 @@ class NIXIETUBE(object):
 
         """
         self.__buf_d[bit % self.__LED] = _SEGMENTS[num % 16]
-        self.__dat(bit, _SEGMENTS[num % 16])
+        self.__show_frame()
+
+    def __render(self, text, right=False):
+        # fold '.' into the decimal point of the previous digit
+        buf = self.__buf_d
+        n = 0
+        for ch in text:
+            if ch == '.' and n > 0 and not buf[n - 1] & 0x80:
+                buf[n - 1] |= 0x80
+            elif n < self.__LED:
+                c = ord(ch)
+                buf[n] = _ASCII[c] if c < 128 else 0
+                n += 1
+        if right and n < self.__LED:
+            shift = self.__LED - n
+            for i in range(self.__LED - 1, -1, -1):
+                buf[i] = buf[i - shift] if i >= shift else 0
+        else:
+            for i in range(n, self.__LED):
+                buf[i] = 0
+        self.__show_frame()
+
+    def set_show_text(self, text):
+        """
+
+        显示字符串，左对齐，支持数字、大部分字母及 - _ = 等符号，'.' 显示为前一位的小数点
+
+        Args:
+            text (str): 要显示的字符串，超出部分不显示
+
+        """
+        self.__render(text)
+
+    def set_show_float(self, num, decimals=1):
+        """
+
+        显示定点小数，右对齐，小数点与数字一次发送；
+        位数不够时减少小数位数，整数部分也放不下时显示 ----
+
+        Args:
+            num (number): 要显示的数字
+            decimals (number): 小数位数
+
+        """
+        while True:
+            v = int(abs(num) * 10 ** decimals + 0.5)
+            text = str(v)
+            if decimals > 0:
+                text = '0' * (decimals + 1 - len(text)) + text
+                text = text[:-decimals] + '.' + text[-decimals:]
+            if num < 0 and v:
+                text = '-' + text
+            if len(text) - (decimals > 0) <= self.__LED:
+                break
+            if decimals <= 0:
+                text = '-' * self.__LED
+                break
+            decimals -= 1
+        self.__render(text, True)
+
+    def set_show_clock(self, hour, minute, colon=True):
+        """
+
+        以 HH:MM 格式显示时间
+
+        Args:
+            hour (number): 小时 0-99
+            minute (number): 分钟 0-59
+            colon (bool): 是否显示中间的冒号
+
+        """
+        digits = ((hour // 10) % 10, hour % 10, (minute // 10) % 10, minute % 10)
+        buf = self.__buf_d
+        for i in range(min(4, self.__LED)):
+            buf[i] = _SEGMENTS[digits[i]]
+        if colon and self.__LED > 1:
+            buf[1] |= 0x80
+        self.__show_frame()
 
     def set_show_DP(self, bit=1, show=True):
         """
@@ -152,9 +264,10 @@ class NIXIETUBE(object):
         """
         bit = bit % self.__LED
         if show:
-            self.__dat(bit, self.__buf_d[bit] | 0x80)
+            self.__buf_d[bit] |= 0x80
         else:
-            self.__dat(bit, self.__buf_d[bit] & 0x7F)
+            self.__buf_d[bit] &= 0x7F
+        self.__show_frame()
 
     def set_show_num(self, num):
         """
@@ -165,14 +278,15 @@ class NIXIETUBE(object):
             num (number): 要显示的数字 -999——9999
 
         """
-        if num < 0:
-            self.__dat(0, 0x40)  # '-'
-            num = -num
-        else:
-            self.set_show_bit((num // 1000) % 10)
-        self.set_show_bit(num % 10, 3)
-        self.set_show_bit((num // 10) % 10, 2)
-        self.set_show_bit((num // 100) % 10, 1)
+        buf = self.__buf_d
+        neg = num < 0
+        num = abs(num)
+        for i in range(self.__LED - 1, -1, -1):
+            buf[i] = _SEGMENTS[num % 10]
+            num //= 10
+        if neg:
+            buf[0] = 0x40  # '-'
+        self.__show_frame()
 
 
 if __name__ == '__main__':
@@ -27,6 +27,10 @@ ADDR = 0x3C
 screen = bytearray(1025)  # send byte plus pixels
 screen[0] = 0x40
 zoom = 1
+glyphs = {}  # char -> 5 packed column bytes
+# scroll step interval in frames -> SSD1306 interval code
+SCROLL_FRAMES = {5: 0, 64: 1, 128: 2, 256: 3, 3: 4, 4: 5, 25: 6, 2: 7}
+GLYPH_CACHE_SIZE = 64
 
 
 class OLED1306(object):
@@ -35,6 +39,9 @@ class OLED1306(object):
     """
 
     def __init__(self):
+        self.__buffered = False
+        self.__lo = bytearray(b'\xff' * 8)  # dirty column span per page
+        self.__hi = bytearray(8)
         for c in cmd:
             self.__command(c)
 
@@ -48,7 +55,22 @@ class OLED1306(object):
         c1, c2 = c & 0x0F, c >> 4
         self.__command([0x00 | c1])  # lower start column address
         self.__command([0x10 | c2])  # upper start column address
-        
+
+    def __mark(self, page, c0, c1):
+        if c0 < self.__lo[page]:
+            self.__lo[page] = c0
+        if c1 > self.__hi[page]:
+            self.__hi[page] = c1
+
+    def __write_span(self, page, c0, c1):
+        # borrow the byte in front of the span as the 0x40 data prefix
+        self.__set_pos(c0, page)
+        ind = page * 128 + c0
+        t = screen[ind]
+        screen[ind] = 0x40
+        i2c.write(ADDR, memoryview(screen)[ind:ind + c1 - c0 + 2])
+        screen[ind] = t
+
     def set_zoom(self, v):
         global zoom
         if zoom != v:
@@ -67,12 +89,36 @@ class OLED1306(object):
             NONE
         """
         page, shift_page = divmod(y, 8)
-        ind = x + page * 128
+        ind = x + page * 128 + 1
         b = screen[ind] | (1 << shift_page) if color else screen[ind] & ~ (1 << shift_page)
         screen[ind] = b
+        if self.__buffered:
+            self.__mark(page, x, x)
+            return
         self.__set_pos(x, page)
         i2c.write(ADDR, bytearray([0x40, b]))
 
+    def set_buffered(self, on=True):
+        """
+        缓冲绘图模式，开启后绘图只修改显存并记录改动区域，调用 flush 时统一发送
+        Args:
+            on (bool): True 开启 False 关闭，关闭时自动 flush
+        """
+        self.__buffered = on
+        if not on:
+            self.flush()
+
+    def flush(self):
+        """
+        将缓冲模式下改动过的区域发送到屏幕，每页只发送一次改动的列范围
+        """
+        for page in range(8):
+            c0, c1 = self.__lo[page], self.__hi[page]
+            if c0 <= c1:
+                self.__write_span(page, c0, c1)
+                self.__lo[page] = 255
+                self.__hi[page] = 0
+
     def set_clear(self, c=0):
         """
         删除所有显示信息，清屏
@@ -80,7 +126,11 @@ class OLED1306(object):
         global screen
         for i in range(1, 1025):
             screen[i] = 0
-        self.set_refresh()
+        if self.__buffered:
+            for page in range(8):
+                self.__mark(page, 0, 127)
+        else:
+            self.set_refresh()
 
     def set_power_on(self):
         """
@@ -100,6 +150,76 @@ class OLED1306(object):
         """
         self.__set_pos()
         i2c.write(ADDR, screen)
+        for page in range(8):
+            self.__lo[page] = 255
+            self.__hi[page] = 0
+
+    def set_window(self, x0=0, x1=127, p0=0, p1=7):
+        """
+        设置显存写入窗口，之后写入的数据只填充该区域，无参数时恢复全屏
+        Args:
+            x0 (number): 起始列 0-127
+            x1 (number): 结束列 0-127
+            p0 (number): 起始页 0-7
+            p1 (number): 结束页 0-7
+        """
+        self.__command([0x21, x0, x1])  # SSD1306_COLUMNADDR
+        self.__command([0x22, p0, p1])  # SSD1306_PAGEADDR
+
+    def set_refresh_window(self, x, page, w, pages=1):
+        """
+        只刷新显存中的一个矩形区域，一次数据传输完成
+        Args:
+            x (number): 起始列 0-127
+            page (number): 起始页 0-7, 每页 8 行像素
+            w (number): 宽度，列数
+            pages (number): 高度，页数
+        """
+        x1, p1 = min(x + w, 128) - 1, min(page + pages, 8) - 1
+        w = x1 - x + 1
+        buf = bytearray(1 + w * (p1 - page + 1))
+        buf[0] = 0x40
+        i = 1
+        for p in range(page, p1 + 1):
+            ind = p * 128 + x + 1
+            buf[i:i + w] = screen[ind:ind + w]
+            i += w
+        self.set_window(x, x1, page, p1)
+        i2c.write(ADDR, buf)
+        self.set_window()
+
+    def set_scroll(self, left=True, p0=0, p1=7, frames=5, dy=0):
+        """
+        开启硬件滚动，屏幕自行滚动不占用总线；滚动期间写入显存前需先调用 set_scroll_stop
+        Args:
+            left (bool): True 向左滚动 False 向右滚动
+            p0 (number): 滚动起始页 0-7
+            p1 (number): 滚动结束页 0-7
+            frames (number): 每步间隔帧数 2,3,4,5,25,64,128,256
+            dy (number): 每步垂直偏移行数 0-63, 0 为仅水平滚动
+        """
+        self.__command([0x2E])  # SSD1306_DEACTIVATE_SCROLL
+        interval = SCROLL_FRAMES.get(frames, 0)
+        if dy:
+            self.__command([0x2A if left else 0x29, 0x00, p0, interval, p1, dy % 64])
+        else:
+            self.__command([0x27 if left else 0x26, 0x00, p0, interval, p1, 0x00, 0xFF])
+        self.__command([0x2F])  # SSD1306_ACTIVATE_SCROLL
+
+    def set_scroll_area(self, top=0, rows=64):
+        """
+        设置垂直滚动区域，配合 set_scroll 的 dy 参数使用
+        Args:
+            top (number): 顶部固定不滚动的行数
+            rows (number): 滚动区域的行数
+        """
+        self.__command([0xA3, top, rows])  # SSD1306_SET_VERTICAL_SCROLL_AREA
+
+    def set_scroll_stop(self):
+        """
+        停止硬件滚动
+        """
+        self.__command([0x2E])  # SSD1306_DEACTIVATE_SCROLL
 
     def set_text(self, x, y, text, draw=1):
         """
@@ -111,19 +231,72 @@ class OLED1306(object):
         Returns:
             NONE
         """
-        for i in range(0, min(len(text), 12 - x)):
-            for c in range(0, 5):
+        n = min(len(text), 12 - x)
+        if n <= 0:
+            return
+        ind = x * 5 + y * 128 + 1
+        for i in range(n):
+            screen[ind:ind + 5] = self.__glyph(text[i])
+            ind += 5
+        if self.__buffered:
+            self.__mark(y, x * 5, x * 5 + n * 5 - 1)
+        elif draw == 1:
+            self.set_zoom(1)
+            self.__write_span(y, x * 5, x * 5 + n * 5 - 1)
+
+    def __glyph(self, ch):
+        g = glyphs.get(ch)
+        if g is None:
+            img = Image(ch)
+            g = bytearray(5)
+            for c in range(5):
                 col = 0
                 for r in range(1, 6):
-                    p = Image(text[i]).get_pixel(c, r - 1)
-                    col = col | (1 << r) if (p != 0) else col
-                ind = x * 5 + y * 128 + i * 5 + c + 1
-                screen[ind] = col
-        if draw == 1:
-            self.set_zoom(1)
-            self.__set_pos(x * 5, y)
-            ind0 = x * 10 + y * 128 + 1
-            i2c.write(ADDR, b'\x40' + screen[ind0:ind + 1])
+                    if img.get_pixel(c, r - 1):
+                        col |= 1 << r
+                g[c] = col
+            g = bytes(g)
+            if len(glyphs) >= GLYPH_CACHE_SIZE:
+                glyphs.popitem()
+            glyphs[ch] = g
+        return g
+
+    def __begin(self):
+        buffered = self.__buffered
+        self.__buffered = True
+        return buffered
+
+    def __end(self, buffered):
+        self.__buffered = buffered
+        if not buffered:
+            self.flush()
+
+    def __plot(self, x, y, c):
+        if 0 <= x < 128 and 0 <= y < 64:
+            ind = (y >> 3) * 128 + x + 1
+            if c:
+                screen[ind] |= 1 << (y & 7)
+            else:
+                screen[ind] &= ~(1 << (y & 7))
+            self.__mark(y >> 3, x, x)
+
+    def __fill(self, x0, x1, y0, y1, c):
+        # masks whole page bytes, so a vertical span costs one write per page
+        x0, x1 = max(x0, 0), min(x1, 127)
+        y0, y1 = max(y0, 0), min(y1, 63)
+        if x0 > x1 or y0 > y1:
+            return
+        p0, p1 = y0 >> 3, y1 >> 3
+        for page in range(p0, p1 + 1):
+            m = 0xFF
+            if page == p0:
+                m &= 0xFF << (y0 & 7)
+            if page == p1:
+                m &= 0xFF >> (7 - (y1 & 7))
+            base = page * 128 + 1
+            for ind in range(base + x0, base + x1 + 1):
+                screen[ind] = screen[ind] | m if c else screen[ind] & ~m
+            self.__mark(page, x0, x1)
 
     def draw_row(self, x, y, l, c=1):
         """
@@ -134,9 +307,14 @@ class OLED1306(object):
             l (number): 线段长度
             c (number): 1: 显示线段  2: 消除线段
         """
-        d = 1 if l > 0 else -1
-        for i in range(x, x + l, d):
-            self.set_pixel(i, y, c)
+        if l == 0:
+            return
+        buffered = self.__begin()
+        if l > 0:
+            self.__fill(x, x + l - 1, y, y, c)
+        else:
+            self.__fill(x + l + 1, x, y, y, c)
+        self.__end(buffered)
 
     def draw_col(self, x, y, l, c=1):
         """
@@ -147,10 +325,177 @@ class OLED1306(object):
             l (number): 线段长度
             c (number): 1: 显示线段  2: 消除线段
         """
+        if l == 0:
+            return
+        buffered = self.__begin()
+        if l > 0:
+            self.__fill(x, x, y, y + l - 1, c)
+        else:
+            self.__fill(x, x, y + l + 1, y, c)
+        self.__end(buffered)
+
+    def draw_line(self, x0, y0, x1, y1, c=1):
+        """
+        画一条直线
+        Args:
+            x0 (number): 起点 X 轴坐标 0-127
+            y0 (number): 起点 Y 轴坐标 0-63
+            x1 (number): 终点 X 轴坐标 0-127
+            y1 (number): 终点 Y 轴坐标 0-63
+            c (number): 1: 显示线段  0: 消除线段
+        """
+        buffered = self.__begin()
+        if x0 == x1 or y0 == y1:
+            self.__fill(min(x0, x1), max(x0, x1), min(y0, y1), max(y0, y1), c)
+        else:
+            dx, dy = abs(x1 - x0), -abs(y1 - y0)
+            sx = 1 if x0 < x1 else -1
+            sy = 1 if y0 < y1 else -1
+            err = dx + dy
+            while True:
+                self.__plot(x0, y0, c)
+                if x0 == x1 and y0 == y1:
+                    break
+                e2 = 2 * err
+                if e2 >= dy:
+                    err += dy
+                    x0 += sx
+                if e2 <= dx:
+                    err += dx
+                    y0 += sy
+        self.__end(buffered)
+
+    def draw_rect(self, x, y, w, h, c=1):
+        """
+        画一个矩形边框
+        Args:
+            x (number): 左上角 X 轴坐标 0-127
+            y (number): 左上角 Y 轴坐标 0-63
+            w (number): 宽度
+            h (number): 高度
+            c (number): 1: 显示  0: 消除
+        """
+        if w <= 0 or h <= 0:
+            return
+        buffered = self.__begin()
+        self.__fill(x, x + w - 1, y, y, c)
+        self.__fill(x, x + w - 1, y + h - 1, y + h - 1, c)
+        self.__fill(x, x, y, y + h - 1, c)
+        self.__fill(x + w - 1, x + w - 1, y, y + h - 1, c)
+        self.__end(buffered)
+
+    def fill_rect(self, x, y, w, h, c=1):
+        """
+        画一个实心矩形
+        Args:
+            x (number): 左上角 X 轴坐标 0-127
+            y (number): 左上角 Y 轴坐标 0-63
+            w (number): 宽度
+            h (number): 高度
+            c (number): 1: 显示  0: 消除
+        """
+        if w <= 0 or h <= 0:
+            return
+        buffered = self.__begin()
+        self.__fill(x, x + w - 1, y, y + h - 1, c)
+        self.__end(buffered)
+
+    def draw_circle(self, x0, y0, r, c=1, fill=False):
+        """
+        画一个圆
+        Args:
+            x0 (number): 圆心 X 轴坐标 0-127
+            y0 (number): 圆心 Y 轴坐标 0-63
+            r (number): 半径
+            c (number): 1: 显示  0: 消除
+            fill (bool): True 实心圆 False 空心圆
+        """
+        buffered = self.__begin()
+        x, y, err = r, 0, 1 - r
+        while x >= y:
+            if fill:
+                self.__fill(x0 + y, x0 + y, y0 - x, y0 + x, c)
+                self.__fill(x0 - y, x0 - y, y0 - x, y0 + x, c)
+                self.__fill(x0 + x, x0 + x, y0 - y, y0 + y, c)
+                self.__fill(x0 - x, x0 - x, y0 - y, y0 + y, c)
+            else:
+                for px, py in ((x, y), (y, x), (-y, x), (-x, y),
+                               (-x, -y), (-y, -x), (y, -x), (x, -y)):
+                    self.__plot(x0 + px, y0 + py, c)
+            y += 1
+            if err < 0:
+                err += 2 * y + 1
+            else:
+                x -= 1
+                err += 2 * (y - x) + 1
+        self.__end(buffered)
 
-        d = 1 if l > 0 else -1
-        for i in range(y, y + l, d):
-            self.set_pixel(x, i, c)
+    def draw_bitmap(self, x, y, w, h, data):
+        """
+        显示一张位图，覆盖该区域原有内容
+        Args:
+            x (number): 左上角 X 轴坐标 0-127
+            y (number): 左上角 Y 轴坐标 0-63
+            w (number): 位图宽度
+            h (number): 位图高度
+            data (bytes): 与显存相同的按页纵向排列数据，每字节为一列的 8 个像素，
+                          共 ((h + 7) // 8) * w 字节
+        """
+        buffered = self.__begin()
+        sh = y & 7
+        for sp in range((h + 7) // 8):
+            m = 0xFF if h - sp * 8 >= 8 else 0xFF >> (8 - (h - sp * 8))
+            page = (y >> 3) + sp
+            lo = (m << sh) & 0xFF
+            hi = m >> (8 - sh) if sh else 0
+            for i in range(w):
+                col = x + i
+                if col < 0 or col > 127:
+                    continue
+                b = data[sp * w + i] & m
+                if 0 <= page < 8:
+                    ind = page * 128 + col + 1
+                    screen[ind] = (screen[ind] & ~lo) | ((b << sh) & 0xFF)
+                if hi and 0 <= page + 1 < 8:
+                    ind = (page + 1) * 128 + col + 1
+                    screen[ind] = (screen[ind] & ~hi) | (b >> (8 - sh))
+            c0, c1 = max(x, 0), min(x + w - 1, 127)
+            if c0 <= c1:
+                if 0 <= page < 8:
+                    self.__mark(page, c0, c1)
+                if hi and 0 <= page + 1 < 8:
+                    self.__mark(page + 1, c0, c1)
+        self.__end(buffered)
+
+    def scroll(self, dx, dy):
+        """
+        平移整个显存内容，移出的部分丢弃，空出的部分清空
+        Args:
+            dx (number): X 轴平移像素，正数向右
+            dy (number): Y 轴平移像素，正数向下
+        """
+        buffered = self.__begin()
+        if dx:
+            dx = max(-128, min(dx, 128))
+            for page in range(8):
+                base = page * 128 + 1
+                if dx > 0:
+                    screen[base + dx:base + 128] = screen[base:base + 128 - dx]
+                    screen[base:base + dx] = bytes(dx)
+                else:
+                    screen[base:base + 128 + dx] = screen[base - dx:base + 128]
+                    screen[base + 128 + dx:base + 128] = bytes(-dx)
+        if dy:
+            for x in range(1, 129):
+                col = 0
+                for page in range(8):
+                    col |= screen[page * 128 + x] << (page * 8)
+                col = col << dy if dy > 0 else col >> -dy
+                for page in range(8):
+                    screen[page * 128 + x] = (col >> (page * 8)) & 0xFF
+        for page in range(8):
+            self.__mark(page, 0, 127)
+        self.__end(buffered)
 
 
 if __name__ == '__main__':
@@ -10,6 +10,56 @@ DS1307_REG_MONTH = 5
 DS1307_REG_YEAR = 6
 DS1307_REG_CTRL = 7
 DS1307_REG_RAM = 8
+DS1307_RAM_SIZE = 56
+CLOCK_SLEW_DIV = 100  # a local clock running ahead is slowed by 1/100 until it is back on the RTC
+
+# BCD <-> decimal lookup tables
+_BCD2DEC = bytes((b >> 4) * 10 + (b & 0x0F) for b in range(256))
+_DEC2BCD = bytes((d // 10) * 16 + d % 10 for d in range(100))
+
+
+def to_epoch(dt):
+    """
+
+    时间转换为从 2000-01-01 00:00:00 开始的秒数
+
+    Args:
+        dt (list): 时间列表 [year,month,day,week,hour,minute,second]
+
+    Returns:
+        seconds (number): 秒数
+    """
+    y, m = dt[0], dt[1]
+    if m < 3:
+        y -= 1
+        m += 12
+    days = 365 * y + y // 4 - y // 100 + y // 400 + (153 * (m - 3) + 2) // 5 + dt[2] - 730426
+    return ((days * 24 + dt[4]) * 60 + dt[5]) * 60 + dt[6]
+
+
+def from_epoch(seconds, week=0):
+    """
+
+    从 2000-01-01 00:00:00 开始的秒数转换为时间
+
+    Args:
+        seconds (number): 秒数
+        week (number): 星期字段的值，DS1307 的星期由用户定义，此处原样填入
+
+    Returns:
+        datetime (tuple): (year,month,day,week,hour,minute,second)
+    """
+    days, t = divmod(seconds, 86400)
+    z = days + 730425  # days since 0000-03-01
+    era = z // 146097
+    doe = z - era * 146097
+    yoe = (doe - doe // 1460 + doe // 36524 - doe // 146096) // 365
+    doy = doe - (365 * yoe + yoe // 4 - yoe // 100)
+    mp = (5 * doy + 2) // 153
+    d = doy - (153 * mp + 2) // 5 + 1
+    m = mp + 3 if mp < 10 else mp - 9
+    y = yoe + era * 400 + (1 if m <= 2 else 0)
+    return (y, m, d, week, t // 3600, (t // 60) % 60, t % 60)
 
 
 class DS1307(object):
@@ -19,6 +69,19 @@ class DS1307(object):
 
     """
 
+    def __init__(self, max_age_ms=0):
+        """
+
+        Args:
+            max_age_ms (number): 时间快照有效时间 ms，此时间内 Year/Month/.../Second 读取直接使用快照，0 为每次都重新读取
+
+        """
+        self.__max_age = max_age_ms
+        self.__snap = None
+        self.__snap_time = 0
+        self.__clock = False
+        self.__ring = None
+
     # set reg
     def __i2c_setReg(self, reg, dat):
         buf = bytearray(2)
@@ -51,12 +114,13 @@ class DS1307(object):
         """
         t = self.__i2c_getReg(DS1307_REG_SECOND)
         self.__i2c_setReg(DS1307_REG_SECOND, t | 0x80)
+        self.__invalidate()
 
     def __DecToHex(self, dat):
-        return (dat // 10) * 16 + (dat % 10)
+        return _DEC2BCD[dat]
 
     def __HexToDec(self, dat):
-        return (dat // 16) * 10 + (dat % 16)
+        return _BCD2DEC[dat]
 
     def DateTime(self, datalist=None):
         """
@@ -71,17 +135,7 @@ class DS1307(object):
             datalist (list): 当前时间列表 [year,month,day,week,hour,minute,second]
         """
         if datalist is None:
-            i2c.write(DS1307_I2C_ADDRESS, bytearray([0]))
-            buf = i2c.read(DS1307_I2C_ADDRESS, 7)
-            datalist = [0] * 7
-            datalist[0] = self.__HexToDec(buf[6]) + 2000
-            datalist[1] = self.__HexToDec(buf[5])
-            datalist[2] = self.__HexToDec(buf[4])
-            datalist[3] = self.__HexToDec(buf[3])
-            datalist[4] = self.__HexToDec(buf[2])
-            datalist[5] = self.__HexToDec(buf[1])
-            datalist[6] = self.__HexToDec(buf[0])
-            return datalist
+            return list(self.get_clock() if self.__clock else self.__read_snapshot())
         else:
             buf = bytearray(8)
             buf[0] = 0
@@ -93,6 +147,152 @@ class DS1307(object):
             buf[6] = self.__DecToHex(datalist[1] % 13)  # month
             buf[7] = self.__DecToHex(datalist[0] % 100)  # year
             i2c.write(DS1307_I2C_ADDRESS, buf)
+            self.__invalidate()
+
+    def __invalidate(self):
+        self.__snap = None
+        if self.__clock:
+            self.__anchor_epoch = None
+            self.sync()
+
+    def __read_snapshot(self):
+        i2c.write(DS1307_I2C_ADDRESS, bytearray([0]))
+        buf = i2c.read(DS1307_I2C_ADDRESS, 7)
+        h = _BCD2DEC
+        self.__snap = (h[buf[6]] + 2000, h[buf[5]], h[buf[4]], h[buf[3]], h[buf[2]], h[buf[1]], h[buf[0]])
+        self.__snap_time = running_time()
+        return self.__snap
+
+    def get_snapshot(self, max_age_ms=None):
+        """
+
+        一次读取全部时间字段，各字段来自同一时刻，不会出现跨秒错位
+
+        Args:
+            max_age_ms (number): 快照有效时间 ms，为空时使用构造时的设置
+
+        Returns:
+            snapshot (tuple): (year,month,day,week,hour,minute,second)
+        """
+        if self.__clock:
+            return self.get_clock()
+        if max_age_ms is None:
+            max_age_ms = self.__max_age
+        if self.__snap is None or running_time() - self.__snap_time >= max_age_ms:
+            return self.__read_snapshot()
+        return self.__snap
+
+    def set_clock_mode(self, on=True, resync_s=3600):
+        """
+
+        本地时钟模式，读取一次 RTC 后以 running_time() 计时，不再访问总线，
+        每隔 resync_s 秒重新同步一次并估算本地时钟的漂移
+
+        Args:
+            on (bool): True 开启 False 关闭
+            resync_s (number): 重新同步间隔 s
+
+        """
+        self.__clock = False
+        if on:
+            self.__resync_ms = resync_s * 1000
+            self.__drift_ppm = 0
+            self.__anchor_epoch = None
+            self.sync()
+        self.__clock = on
+
+    def sync(self):
+        """
+
+        立即与 RTC 同步本地时钟；本地时钟偏慢时直接追上，偏快时不回拨，
+        而是放慢 1/CLOCK_SLEW_DIV 逐渐追回，本地时间始终单调不减
+
+        Returns:
+            error (number): 本地时钟与 RTC 的偏差 s，首次同步返回 0
+        """
+        now = running_time()
+        snap = self.__read_snapshot()
+        epoch = to_epoch(snap)
+        self.__sync_ms = now
+        err = 0
+        week = snap[3]
+        if self.__anchor_epoch is None:
+            self.__base_epoch, self.__base_ms = epoch, now
+        else:
+            local = self.__local_epoch(now)
+            err = local - epoch
+            elapsed = now - self.__base_ms
+            if elapsed >= 600000:
+                # the RTC only shows whole seconds, so estimate the rate over the whole run
+                rtc_ms = (epoch - self.__base_epoch) * 1000
+                self.__drift_ppm = (elapsed - rtc_ms) * 1000000 // elapsed
+            if err == 0:
+                return 0  # keep the anchor so local time stays monotonic
+            if err > 0:
+                # never step back: re-anchor at the local time and slew the excess away
+                week = (week - 1 + local // 86400 - epoch // 86400) % 7 + 1
+                epoch = local
+        self.__slew_ms = max(err, 0) * 1000
+        self.__anchor_epoch = epoch
+        self.__anchor_ms = now
+        self.__anchor_week = week
+        return err
+
+    def __local_epoch(self, now):
+        elapsed = now - self.__anchor_ms
+        elapsed -= elapsed * self.__drift_ppm // 1000000
+        elapsed -= min(self.__slew_ms, elapsed // CLOCK_SLEW_DIV)
+        return self.__anchor_epoch + elapsed // 1000
+
+    def get_drift(self):
+        """
+
+        本地时钟相对 RTC 的漂移估计
+
+        Returns:
+            drift (number): 漂移 ppm, 正数表示本地时钟偏快
+        """
+        return self.__drift_ppm
+
+    def get_epoch(self):
+        """
+
+        读取从 2000-01-01 00:00:00 开始的秒数，时钟模式下不访问总线
+
+        Returns:
+            seconds (number): 秒数
+        """
+        if self.__clock:
+            now = running_time()
+            if now - self.__sync_ms >= self.__resync_ms:
+                self.sync()
+            return self.__local_epoch(now)
+        return to_epoch(self.get_snapshot())
+
+    def get_clock(self):
+        """
+
+        时钟模式下读取当前时间，不访问总线
+
+        Returns:
+            datetime (tuple): (year,month,day,week,hour,minute,second)
+        """
+        if not self.__clock:
+            return self.get_snapshot()
+        epoch = self.get_epoch()
+        week = (self.__anchor_week - 1 + (epoch // 86400 - self.__anchor_epoch // 86400)) % 7 + 1
+        return from_epoch(epoch, week)
+
+    def set_max_age(self, ms):
+        """
+
+        设置时间快照有效时间
+
+        Args:
+            ms (number): 快照有效时间 ms，0 为每次都重新读取
+
+        """
+        self.__max_age = ms
 
     def Year(self, year=None):
         """
@@ -107,9 +307,10 @@ class DS1307(object):
             year (number): 当前年份
         """
         if year == None:
-            return self.__HexToDec(self.__i2c_getReg(DS1307_REG_YEAR)) + 2000
+            return self.get_snapshot()[0]
         else:
             self.__i2c_setReg(DS1307_REG_YEAR, self.__DecToHex(year % 100))
+            self.__invalidate()
 
     def Month(self, month=None):
         """
@@ -124,9 +325,10 @@ class DS1307(object):
             mouth (number): 当前月份
         """
         if month == None:
-            return self.__HexToDec(self.__i2c_getReg(DS1307_REG_MONTH))
+            return self.get_snapshot()[1]
         else:
             self.__i2c_setReg(DS1307_REG_MONTH, self.__DecToHex(month % 13))
+            self.__invalidate()
 
     def Day(self, day=None):
         """
@@ -141,9 +343,10 @@ class DS1307(object):
             day (number): 当前日
         """
         if day == None:
-            return self.__HexToDec(self.__i2c_getReg(DS1307_REG_DAY))
+            return self.get_snapshot()[2]
         else:
             self.__i2c_setReg(DS1307_REG_DAY, self.__DecToHex(day % 32))
+            self.__invalidate()
 
     def Weekday(self, weekday=None):
         """
@@ -158,9 +361,10 @@ class DS1307(object):
             weekday (number): 当前星期
         """
         if weekday == None:
-            return self.__HexToDec(self.__i2c_getReg(DS1307_REG_WEEKDAY))
+            return self.get_snapshot()[3]
         else:
             self.__i2c_setReg(DS1307_REG_WEEKDAY, self.__DecToHex(weekday % 8))
+            self.__invalidate()
 
     def Hour(self, hour=None):
         """
@@ -175,9 +379,10 @@ class DS1307(object):
             hour (number): 当前小时
         """
         if hour == None:
-            return self.__HexToDec(self.__i2c_getReg(DS1307_REG_HOUR))
+            return self.get_snapshot()[4]
         else:
             self.__i2c_setReg(DS1307_REG_HOUR, self.__DecToHex(hour % 24))
+            self.__invalidate()
 
     def Minute(self, minute=None):
         """
@@ -192,9 +397,10 @@ class DS1307(object):
             minute (number): 当前分钟
         """
         if minute == None:
-            return self.__HexToDec(self.__i2c_getReg(DS1307_REG_MINUTE))
+            return self.get_snapshot()[5]
         else:
             self.__i2c_setReg(DS1307_REG_MINUTE, self.__DecToHex(minute % 60))
+            self.__invalidate()
 
     def Second(self, second=None):
         """
@@ -209,9 +415,139 @@ class DS1307(object):
             second (number): 当前秒
         """
         if second == None:
-            return self.__HexToDec(self.__i2c_getReg(DS1307_REG_SECOND))
+            return self.get_snapshot()[6]
         else:
             self.__i2c_setReg(DS1307_REG_SECOND, self.__DecToHex(second % 60))
+            self.__invalidate()
+
+    def read_ram(self, addr=0, n=DS1307_RAM_SIZE):
+        """
+
+        连续读取电池供电的 RAM，掉电不丢失
+
+        Args:
+            addr (number): 起始地址 0-55
+            n (number): 读取字节数
+
+        Returns:
+            data (bytes): 读取的数据
+        """
+        if addr < 0 or n < 0 or addr + n > DS1307_RAM_SIZE:
+            raise ValueError('ram address error,0-55')
+        i2c.write(DS1307_I2C_ADDRESS, bytearray([DS1307_REG_RAM + addr]))
+        return i2c.read(DS1307_I2C_ADDRESS, n)
+
+    def write_ram(self, addr, data):
+        """
+
+        连续写入电池供电的 RAM，掉电不丢失
+
+        Args:
+            addr (number): 起始地址 0-55
+            data (bytes): 要写入的数据
+
+        """
+        if addr < 0 or addr + len(data) > DS1307_RAM_SIZE:
+            raise ValueError('ram address error,0-55')
+        i2c.write(DS1307_I2C_ADDRESS, bytes([DS1307_REG_RAM + addr]) + bytes(data))
+
+    def __checksum(self, data):
+        return ~sum(data) & 0xFF  # all-zero RAM never validates
+
+    def ram_counter(self, addr, add=1):
+        """
+
+        RAM 中带校验的 32 位计数器，占用 5 字节，可用于开机次数等，没有 Flash 的写入寿命问题
+
+        Args:
+            addr (number): 计数器地址 0-51
+            add (number): 增加的值，0 为只读取
+
+        Returns:
+            value (number): 计数器当前值，校验失败时从 0 开始
+        """
+        buf = self.read_ram(addr, 5)
+        v = 0
+        if self.__checksum(buf[:4]) == buf[4]:
+            v = buf[0] | (buf[1] << 8) | (buf[2] << 16) | (buf[3] << 24)
+        if add:
+            v = (v + add) & 0xFFFFFFFF
+            b = bytes([v & 0xFF, (v >> 8) & 0xFF, (v >> 16) & 0xFF, v >> 24])
+            self.write_ram(addr, b + bytes([self.__checksum(b)]))
+        return v
+
+    def ring_setup(self, size, addr=0, length=DS1307_RAM_SIZE):
+        """
+
+        在 RAM 中建立环形缓冲区，每条记录带校验；已有相同格式的缓冲区时继续使用其中的数据
+
+        Args:
+            size (number): 每条记录的字节数
+            addr (number): 缓冲区起始地址
+            length (number): 缓冲区占用的字节数，4 字节头加 (size + 1) 字节每条记录
+
+        Returns:
+            capacity (number): 可保存的记录条数
+        """
+        cap = (length - 4) // (size + 1)
+        if cap < 1:
+            raise ValueError('ring buffer too small')
+        head = self.read_ram(addr, 4)
+        if head[0] != size or head[1] >= cap or head[2] > cap or self.__checksum(head[:3]) != head[3]:
+            head = bytes([size, 0, 0])
+            self.write_ram(addr, head + bytes([self.__checksum(head)]))
+        self.__ring = [addr, size, cap, head[1], head[2]]
+        return cap
+
+    def ring_push(self, record):
+        """
+
+        写入一条记录，缓冲区满时覆盖最旧的记录
+
+        Args:
+            record (bytes): 记录数据，超出 size 部分截断，不足补 0
+
+        """
+        addr, size, cap, head, count = self.__ring
+        rec = (bytes(record) + bytes(size))[:size]
+        self.write_ram(addr + 4 + head * (size + 1), rec + bytes([self.__checksum(rec)]))
+        head = (head + 1) % cap
+        count = min(count + 1, cap)
+        # header goes last, so a reset mid-write only loses the new record
+        h = bytes([size, head, count])
+        self.write_ram(addr, h + bytes([self.__checksum(h)]))
+        self.__ring[3] = head
+        self.__ring[4] = count
+
+    def ring_items(self):
+        """
+
+        一次读出缓冲区中的全部有效记录
+
+        Returns:
+            records (list): 记录列表，从旧到新，校验失败的记录被跳过
+        """
+        addr, size, cap, head, count = self.__ring
+        buf = self.read_ram(addr + 4, cap * (size + 1))
+        items = []
+        for i in range(head - count, head):
+            o = (i % cap) * (size + 1)
+            rec = buf[o:o + size]
+            if self.__checksum(rec) == buf[o + size]:
+                items.append(bytes(rec))
+        return items
+
+    def ring_clear(self):
+        """
+
+        清空环形缓冲区
+
+        """
+        addr, size = self.__ring[0], self.__ring[1]
+        h = bytes([size, 0, 0])
+        self.write_ram(addr, h + bytes([self.__checksum(h)]))
+        self.__ring[3] = 0
+        self.__ring[4] = 0
 
 
 if __name__ == '__main__':
@@ -219,3 +555,8 @@ if __name__ == '__main__':
     ds.DateTime([2020, 5, 22, 5, 21, 32, 15])
     sleep(5000)
     print(ds.DateTime())
+    print(ds.get_snapshot())
+    print("boot count:", ds.ram_counter(51))
+    ds.ring_setup(4, 0, 51)
+    ds.ring_push(bytes([1, 2, 3, 4]))
+    print(ds.ring_items())
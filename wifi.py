@@ -1,6 +1,114 @@
 from microbit import *
 import time
 
+class ATRequest:
+    """
+    一条排队发送的 AT 命令，由 ESP8266_IoT.send_async 返回
+    done: 是否已结束  ok: 是否收到期望的响应  response: 匹配到的响应行，超时为 None
+    data: 收到 '>' 提示符后发送的数据，发送后置为 None
+    """
+    def __init__(self, command, key, timeout, callback, data=None):
+        self.command = command
+        self.data = data
+        self.key = key
+        self.timeout = timeout
+        self.callback = callback
+        self.done = False
+        self.ok = False
+        self.response = None
+        self.sent_time = time.ticks_ms()  # queue time until the command is sent
+        self.ended = False
+        self.expire = None
+
+    def wait(self):
+        """
+        阻塞等待命令结束，超过 timeout 仍未结束则按失败处理，
+        串口处理函数不运行时 (例如在回调函数中调用) 也不会一直阻塞
+        Returns:
+            匹配到的响应行，失败或超时返回 None
+        """
+        while not self.done:
+            if time.ticks_diff(time.ticks_ms(), self.sent_time) > self.timeout:
+                self.expire(self)
+                break
+            sleep(1)
+        return self.response
+
+MQTT_PUBLISH_TICK_MS = 20
+MQTT_PUBLISH_RETRIES = 3
+
+
+# words the module only ever prints at the start of a line, e.g. "WIFI GOT IP" or
+# "+MQTTSUBRECV:...", keys starting with one of them are dispatched by dict lookup
+_LINE_HEADS = ('WIFI', 'MQTTSUBRECV', 'MQTTCONNECTED', 'MQTTDISCONNECTED', 'MQTTPUB',
+               'HTTPCLIENT', 'CIPSNTPTIME', 'CWJAP')
+_SUBRECV = b'+MQTTSUBRECV:'
+
+
+def _line_head(s):
+    # first word of a line or key without the leading '+'
+    if s.startswith('+'):
+        s = s[1:]
+    i = len(s)
+    for sep in ' :,\r':
+        j = s.find(sep, 0, i)
+        if j >= 0:
+            i = j
+    return s[:i]
+
+
+def _at_escape(s):
+    # AT string parameters need \\, \" and \, escaped
+    return s.replace('\\', '\\\\').replace('"', '\\"').replace(',', '\\,')
+
+
+def _parse_subrecv(msg):
+    # +MQTTSUBRECV:<link>,"<topic>",<len>,<data>, data is taken by its length
+    # and may contain commas; returned as str when it is valid utf-8, else bytes
+    if isinstance(msg, str):
+        msg = msg.encode()
+    i = msg.find(b',"') + 2
+    j = msg.find(b'",', i)
+    k = msg.find(b',', j + 2)
+    data = msg[k + 1:k + 1 + int(msg[j + 2:k])]
+    try:
+        data = data.decode('utf-8')
+    except UnicodeError:
+        pass
+    return msg[i:j].decode('utf-8'), data
+
+
+def _trie_match(node, levels, i, out):
+    # collect handlers of every subscription matching levels[i:], O(depth)
+    children = node[1]
+    wild = i > 0 or not levels[0].startswith('$')  # $SYS topics never match a leading wildcard
+    child = children.get('#') if wild else None
+    if child is not None and child[0] is not None:
+        out.append(child[0])  # "a/#" also matches "a"
+    if i == len(levels):
+        if node[0] is not None:
+            out.append(node[0])
+        return
+    child = children.get(levels[i])
+    if child is not None:
+        _trie_match(child, levels, i + 1, out)
+    child = children.get('+') if wild else None
+    if child is not None:
+        _trie_match(child, levels, i + 1, out)
+
+
+def _json_fields(fields):
+    items = []
+    for k, v in fields.items():
+        if isinstance(v, bool):
+            items.append('"{}":{}'.format(k, 'true' if v else 'false'))
+        elif isinstance(v, (int, float)):
+            items.append('"{}":{}'.format(k, v))
+        else:
+            v = str(v).replace('\\', '\\\\').replace('"', '\\"')
+            items.append('"{}":"{}"'.format(k, v))
+    return '{' + ','.join(items) + '}'
+
 #WIFI模块
 #注：因文件大小编译限制，当因文件过大无法下载时，可删除未用到的类平台，例如将class ESP8266_IFTTT整体直接删除
 class ESP8266_IoT:
@@ -9,6 +117,9 @@ class ESP8266_IoT:
     J3 = 2
     J4 = 3
     wifi_init_flag = True
+    RX_BUF_SIZE = 512
+    AT_QUEUE_SIZE = 8
+    AT_GUARD_MS = 200
     def __init__(self, *ports, tx=None, rx=None):
         """
         初始化 ESP8266 模块。
@@ -20,7 +131,17 @@ class ESP8266_IoT:
         """
         self.wifi_connected = False
         self.msg_handler_map = {}
-        self.str_buf = ""
+        self.msg_substr_keys = []
+        self.msg_head_keys = {}  # line head -> keys
+        # receive ring buffer: rx_n bytes from rx_rd, the first rx_scan have no newline
+        self.rx_buf = bytearray(ESP8266_IoT.RX_BUF_SIZE)
+        self.rx_mv = memoryview(self.rx_buf)
+        self.rx_rd = 0
+        self.rx_n = 0
+        self.rx_scan = 0
+        self.rx_skip = False
+        self.at_queue = []
+        self.at_current = None
 
         # 判断是否使用预设配置（J1-J4）
         if ports:
@@ -46,49 +167,250 @@ class ESP8266_IoT:
             ESP8266_IoT.wifi_init_flag = False
 
     def serial_data_handler(self):
-        try:
-            if uart.any():
-                data = uart.read()
-                if data is not None:
-                    self.str_buf += data.decode('utf-8')
-        except Exception as e:
+        self.__at_check()
+
+        size = ESP8266_IoT.RX_BUF_SIZE
+        while uart.any():
+            if self.rx_n == size:
+                # a line longer than the buffer, drop it up to its newline
+                self.rx_rd = self.rx_n = self.rx_scan = 0
+                self.rx_skip = True
+            wr = (self.rx_rd + self.rx_n) % size
+            got = uart.readinto(self.rx_mv[wr:self.rx_rd if wr < self.rx_rd else size])
+            if not got:
+                break
+            self.rx_n += got
+            self.__rx_lines()
+
+    def __rx_find(self, sub, off):
+        # offset of sub from rx_rd, searching from off, -1 if not buffered yet
+        buf, rd, size = self.rx_buf, self.rx_rd, ESP8266_IoT.RX_BUF_SIZE
+        end = rd + self.rx_n
+        a = rd + off
+        if a < size:
+            i = buf.find(sub, a, min(end, size))
+            if i >= 0:
+                return i - rd
+            a = size
+        if end > size:
+            i = buf.find(sub, a - size, end - size)
+            if i >= 0:
+                return i + size - rd
+        return -1
+
+    def __rx_take(self, n, skip=0, text=False):
+        # consume n bytes plus skip more, returns the n bytes as bytes or decoded str
+        rd, size = self.rx_rd, ESP8266_IoT.RX_BUF_SIZE
+        self.rx_n -= n + skip
+        self.rx_rd = (rd + n + skip) % size if self.rx_n else 0
+        self.rx_scan = 0
+        if rd + n <= size:
+            seg = self.rx_mv[rd:rd + n]
+            return str(seg, 'utf-8') if text else bytes(seg)
+        data = bytes(self.rx_mv[rd:]) + bytes(self.rx_mv[:rd + n - size])
+        return data.decode('utf-8') if text else data
+
+    def __rx_lines(self):
+        while self.rx_n:
+            i = self.__rx_find(b'\n', self.rx_scan)
+            if i < 0:
+                self.rx_scan = self.rx_n
+                req = self.at_current
+                if req is not None and req.data is not None and \
+                        self.rx_buf[(self.rx_rd + self.rx_n - 1) % ESP8266_IoT.RX_BUF_SIZE] == 62:
+                    # raw data prompt '>', it is not followed by a newline
+                    self.__rx_take(self.rx_n)
+                    uart.write(req.data)
+                    req.data = None
+                return
+            if self.rx_skip:
+                self.__rx_take(i, 1)
+                self.rx_skip = False
+                continue
+            n = self.__frame_len()
+            if n:
+                if self.rx_n < n:
+                    # the payload itself contains a newline, wait for all of it
+                    self.rx_scan = self.rx_n
+                    return
+                frame = self.__rx_take(n - 2, 2)
+                handler_info = self.msg_handler_map.get('MQTTSUBRECV')
+                if handler_info is not None:
+                    self.__handle(handler_info, frame)
+                continue
+            try:
+                res = self.__rx_take(i, 1, True)
+            except UnicodeError:
+                continue
+            self.__dispatch(res)
+
+    def __frame_len(self):
+        # +MQTTSUBRECV:<link>,"<topic>",<len>,<data> is framed by its length field
+        # so the payload may hold any byte, returns the full record size including \r\n
+        buf, rd, size = self.rx_buf, self.rx_rd, ESP8266_IoT.RX_BUF_SIZE
+        if self.rx_n < 14:
+            return 0
+        for k in range(len(_SUBRECV)):
+            if buf[(rd + k) % size] != _SUBRECV[k]:
+                return 0
+        i = self.__rx_find(b'",', 14)
+        j = self.__rx_find(b',', i + 2) if i >= 0 else -1
+        if j < 0:
+            return 0
+        n = 0
+        for k in range(i + 2, j):
+            c = buf[(rd + k) % size] - 48
+            if not 0 <= c <= 9:
+                return 0
+            n = n * 10 + c
+        n += j + 3
+        return n if n <= size else 0
+
+    def __dispatch(self, res):
+        if self.at_current is not None:
+            self.__at_line(res)
+        # keys on a known line head are looked up by it, e.g. "WIFI GOT IP" -> "WIFI"
+        keys = self.msg_head_keys.get(_line_head(res))
+        if keys is not None:
+            for key in keys:
+                if key in res:
+                    self.__handle(self.msg_handler_map[key], res)
+        for key in self.msg_substr_keys:
+            if key in res:
+                self.__handle(self.msg_handler_map[key], res)
+
+    def __handle(self, handler_info, res):
+        if handler_info['type'] == 0:
+            handler_info['handler'](res)
+        elif handler_info['type'] == 1:
+            handler_info['msg'] = res
+
+    def __msg_key(self, key, add=False):
+        # every key is a substring match; keys starting with a known line head
+        # are only tested on lines with that head, the rest on every line
+        head = _line_head(key)
+        if head in _LINE_HEADS:
+            key = key.lstrip('+')
+            keys = self.msg_head_keys.setdefault(head, [])
+        else:
+            keys = self.msg_substr_keys
+        if add and key not in keys:
+            keys.append(key)
+        return key
+
+    def __at_next(self):
+        if self.at_current is None and self.at_queue:
+            req = self.at_queue.pop(0)
+            self.at_current = req
+            req.sent_time = time.ticks_ms()
+            uart.write((req.command + '\r\n').encode())
+
+    def __at_check(self):
+        # a timed-out command fails at once but keeps the link until its late OK/ERROR
+        # arrives or AT_GUARD_MS passes, so that reply is never credited to the next one
+        req = self.at_current
+        if req is None:
             return
-
-        splits = self.str_buf.split('\n')
-        if self.str_buf and self.str_buf[-1] != '\n':
-            self.str_buf = splits.pop()
+        t = time.ticks_diff(time.ticks_ms(), req.sent_time)
+        if not req.done and t > req.timeout:
+            self.__at_resolve(req, False, None)
+        if req.done and t > req.timeout + ESP8266_IoT.AT_GUARD_MS:
+            self.at_current = None
+            self.__at_next()
+
+    def __at_expire(self, req):
+        # ATRequest.wait gave up, also when the serial handler cannot run
+        if req in self.at_queue:
+            self.at_queue.remove(req)
+            self.__at_resolve(req, False, None)
         else:
-            self.str_buf = ""
-        for res in splits:
-            for key in self.msg_handler_map:
-                if key in res:
-                    handler_info = self.msg_handler_map[key]
-                    if handler_info['type'] == 0:
-                        handler_info['handler'](res)
-                    elif handler_info['type'] == 1:
-                        handler_info['msg'] = res
-
-    def send_at(self, command, wait=0):
-        uart.write((command + '\r\n').encode())
+            self.__at_check()
+
+    def __at_resolve(self, req, ok, res):
+        req.ok = ok
+        req.response = res
+        req.done = True
+        if req.callback is not None:
+            try:
+                req.callback(req)
+            except Exception as e:
+                pass
+
+    def __at_line(self, res):
+        # a command owns the link until it has both matched its key and seen OK/ERROR,
+        # also after it timed out, so its trailing OK is not taken as the next command's response
+        req = self.at_current
+        line = res.strip()
+        failed = line == "ERROR" or line.endswith("FAIL")
+        if not req.done:
+            if line == req.key if req.key == "OK" else req.key in res:
+                self.__at_resolve(req, True, res)
+            elif failed:
+                self.__at_resolve(req, False, None)
+        if failed or line == "OK":
+            req.ended = True
+        if req.done and req.ended:
+            self.at_current = None
+            self.__at_next()
+
+    def send_async(self, command, key="OK", callback=None, timeout=2000, data=None):
+        """
+        AT 命令排队发送，不阻塞；上一条命令收到 OK/ERROR 后立即发送下一条，
+        超时的命令再等待 AT_GUARD_MS 或迟到的 OK/ERROR 后才发送下一条
+        队列已满 (AT_QUEUE_SIZE) 时抛出 OSError，send_at 会等待队列有空位
+        Args:
+            command (str): AT 命令
+            key (str): 表示成功的响应，默认为 OK
+            callback: 命令结束时的回调函数，参数为 ATRequest
+            timeout (number): 超时时间 ms
+            data (bytes): 可选，模块返回 '>' 提示符后原样发送的数据，例如 AT+MQTTPUBRAW 的消息内容
+        Returns:
+            ATRequest, 可用 done/ok/response 查询结果或 wait() 等待
+        """
+        self.__at_check()
+        if len(self.at_queue) >= ESP8266_IoT.AT_QUEUE_SIZE:
+            raise OSError('AT queue full')
+        req = ATRequest(command, key, timeout, callback, data)
+        req.expire = self.__at_expire
+        self.at_queue.append(req)
+        self.__at_next()
+        return req
+
+    def __at_room(self):
+        # block while the queue is full; __at_check also lets it drain when the
+        # serial handler cannot run, e.g. inside a message callback
+        while len(self.at_queue) >= ESP8266_IoT.AT_QUEUE_SIZE:
+            self.__at_check()
+            sleep(1)
+
+    def send_at(self, command, wait=0, timeout=2000):
+        self.__at_room()
+        req = self.send_async(command, timeout=timeout)
         if wait > 0:
             time.sleep_ms(wait)
+        return req
 
     def register_msg_handler(self, key, handler):
-        self.msg_handler_map[key] = {
+        self.msg_handler_map[self.__msg_key(key, True)] = {
             'type': 0,
             'handler': handler
         }
 
     def remove_msg_handler(self, key):
+        key = self.__msg_key(key)
         if key in self.msg_handler_map:
             del self.msg_handler_map[key]
+        keys = self.msg_head_keys.get(_line_head(key), self.msg_substr_keys)
+        if key in keys:
+            keys.remove(key)
 
     def wait_for_response(self, key, wait=1000):
         start_time = time.ticks_ms()
-        self.msg_handler_map[key] = {
+        self.msg_handler_map[self.__msg_key(key, True)] = {
             'type': 1,
             'msg': None
         }
+        key = self.__msg_key(key)
 
         while time.ticks_diff(time.ticks_ms(), start_time) < wait:
             sleep(5)
@@ -96,14 +418,14 @@ class ESP8266_IoT:
                 return None
             if self.msg_handler_map[key].get('msg') is not None:
                 res = self.msg_handler_map[key]['msg']
-                del self.msg_handler_map[key]
+                self.remove_msg_handler(key)
                 return res
-        del self.msg_handler_map[key]
+        self.remove_msg_handler(key)
         return None
 
     def send_request(self, command, key, wait=1000):
-        uart.write((command + '\r\n').encode())
-        return self.wait_for_response(key, wait)
+        self.__at_room()
+        return self.send_async(command, key, timeout=wait).wait()
 
     def reset_esp8266(self):
         self.send_request("AT+RESTORE", "ready")
@@ -121,7 +443,7 @@ class ESP8266_IoT:
 
         retry_count = 2
         while True:
-            self.send_at('AT+CWJAP="{0}","{1}"'.format(ssid, password))
+            self.send_at('AT+CWJAP="{0}","{1}"'.format(ssid, password), timeout=7000)
             start = time.ticks_ms()
             while time.ticks_diff(time.ticks_ms(), start) < 7000:
                 sleep(100)
@@ -148,8 +470,17 @@ class ESP8266_MQTT:
         self.iot = iot_instance
         # MQTT 状态
         self.mqtt_connected = False
-        self.mqtt_sub_handlers = {}  
+        self.mqtt_sub_trie = [None, {}]  # [handler, {level: node}]
         self.mqtt_sub_qos = {}       
+        # 发布队列，同一 Topic 只保留最新的值
+        self.pub_order = []
+        self.pub_pending = {}
+        self.pub_fields = {}
+        self.pub_inflight = None
+        self.pub_interval = 100
+        self.pub_last = 0
+        self.pub_timer = False
+        self.pub_raw = False
 
     def set_mqtt_config(self, scheme: int, client_id: str, username: str, password: str, path: str):
         """
@@ -179,25 +510,24 @@ class ESP8266_MQTT:
 
         retry_count = 3
         while retry_count > 0 and not self.mqtt_connected:
-            self.iot.send_at('AT+MQTTCONN=0,"{}",{},{}'.format(host, port, 0 if reconnect else 1))
-            time.sleep_ms(3500)
+            self.iot.send_request('AT+MQTTCONN=0,"{}",{},{}'.format(host, port, 0 if reconnect else 1),
+                                  "OK", 3500)
             retry_count -= 1
 
-        # 重新订阅之前注册的 Topic
+        # 重新订阅之前注册的 Topic，一次遍历，队列满时 send_at 等待空位
         for topic, qos in self.mqtt_sub_qos.items():
-            self.mqtt_sub_qos[topic] = qos
-            self.iot.send_at('AT+MQTTSUB=0,"{}",{}'.format(topic,qos))
+            self.iot.send_at('AT+MQTTSUB=0,"{}",{}'.format(topic, qos))
 
     def handle_mqtt_message(self,msg: str):
         """
         处理收到的 MQTT 消息
         """
         try:
-            parts = msg.split(",", 4)
-            topic = parts[1].strip('"')
-            message = parts[3].rstrip('"')
-            if topic in self.mqtt_sub_handlers:
-                self.mqtt_sub_handlers[topic](message)
+            topic, message = _parse_subrecv(msg)
+            handlers = []
+            _trie_match(self.mqtt_sub_trie, topic.split('/'), 0, handlers)
+            for handler in handlers:
+                handler(message)
         except Exception as e:
             pass
 
@@ -218,21 +548,137 @@ class ESP8266_MQTT:
         """
         self.iot.send_at('AT+MQTTPUB=0,"{}","{}",{},0'.format(topic,message,qos))
 
+    def publish_mqtt_raw(self, topic: str, data, qos: int = 0):
+        """
+        以 AT+MQTTPUBRAW 发布 MQTT 消息，按长度发送，消息可包含引号、逗号等任意字节，不阻塞
+
+        Args:
+            topic: 主题
+            data: 消息内容 bytes 或 str
+            qos: QoS 等级 (0, 1, 2)
+
+        Returns:
+            ATRequest, 收到 +MQTTPUB:OK 后 ok 为 True；AT 队列已满时抛出 OSError
+        """
+        return self.__pub_send(topic, data, qos, None)
+
+    def __pub_send(self, topic, data, qos, callback):
+        if isinstance(data, str):
+            data = data.encode()
+        return self.iot.send_async('AT+MQTTPUBRAW=0,"{}",{},{},0'.format(topic, len(data), qos),
+                                   "+MQTTPUB:OK", callback, 3000, data)
+
+    def publish_queued(self, topic: str, message, qos: int = 0):
+        """
+        加入发布队列，不阻塞；同一 Topic 未发出的旧值会被新值覆盖
+        消息中的引号和逗号会自动转义
+
+        Args:
+            topic: 主题
+            message: 消息内容
+            qos: QoS 等级 (0, 1, 2)
+        """
+        self.pub_fields.pop(topic, None)  # a plain message replaces queued fields
+        self.__pub_put(topic, message if isinstance(message, bytes) else str(message), qos)
+
+    def publish_field(self, topic: str, field: str, value, qos: int = 0):
+        """
+        把一个字段加入发布队列，同一 Topic 未发出的字段合并为一条 JSON 消息发送
+        例如 publish_field("env", "t", 25) 和 publish_field("env", "h", 60) 发送 {"t":25,"h":60}
+
+        Args:
+            topic: 主题
+            field: 字段名
+            value: 字段值，数字原样发送，其它转为字符串
+            qos: QoS 等级 (0, 1, 2)
+        """
+        fields = self.pub_fields.get(topic)
+        if fields is None:
+            fields = self.pub_fields[topic] = {}
+        fields[field] = value
+        self.__pub_put(topic, None, qos)
+
+    def set_publish_rate(self, ms: int = 100):
+        """
+        设置发布队列的发送间隔，每个间隔最多发送一条，且上一条收到 OK 后才发送下一条；
+        发送失败的消息排到队尾重发，最多发送 MQTT_PUBLISH_RETRIES 次
+
+        Args:
+            ms: 发送间隔 ms
+        """
+        self.pub_interval = ms
+        if not self.pub_timer:
+            run_every(self.publish_tick, ms=MQTT_PUBLISH_TICK_MS)
+            self.pub_timer = True
+
+    def set_publish_raw(self, on: bool = True):
+        """
+        发布队列改用 AT+MQTTPUBRAW 按长度发送，消息不再转义，可发送 bytes
+
+        Args:
+            on: True 开启 False 关闭
+        """
+        self.pub_raw = on
+
+    def get_publish_pending(self):
+        """
+        发布队列中等待发送的 Topic 数量
+        """
+        return len(self.pub_order)
+
+    def __pub_put(self, topic, message, qos):
+        if topic not in self.pub_pending:
+            self.pub_order.append(topic)
+        self.pub_pending[topic] = (message, qos, 0)
+        if not self.pub_timer:
+            self.set_publish_rate(self.pub_interval)
+
+    def publish_tick(self):
+        """
+        从发布队列发送一条消息，后台定时调用，也可在主循环中手动调用
+        """
+        if self.pub_inflight is not None or not self.pub_order or not self.mqtt_connected:
+            return
+        if len(self.iot.at_queue) >= ESP8266_IoT.AT_QUEUE_SIZE:
+            return
+        now = time.ticks_ms()
+        if time.ticks_diff(now, self.pub_last) < self.pub_interval:
+            return
+        self.pub_last = now
+        topic = self.pub_order.pop(0)
+        message, qos, tries = self.pub_pending.pop(topic)
+        if message is None:
+            message = _json_fields(self.pub_fields.pop(topic))
+        callback = lambda req: self.__published(req, topic, message, qos, tries)
+        if self.pub_raw:
+            req = self.__pub_send(topic, message, qos, callback)
+        else:
+            if isinstance(message, bytes):
+                message = message.decode('utf-8')
+            req = self.iot.send_async(
+                'AT+MQTTPUB=0,"{}","{}",{},0'.format(topic, _at_escape(message), qos), callback=callback)
+        self.pub_inflight = req
+
+    def __published(self, req, topic, message, qos, tries):
+        self.pub_inflight = None
+        if not req.ok and topic not in self.pub_pending and tries + 1 < MQTT_PUBLISH_RETRIES:
+            # not accepted and no newer value queued, retry it after the other topics
+            self.pub_order.append(topic)
+            self.pub_pending[topic] = (message, qos, tries + 1)
+
     def on_mqtt_message(self, topic: str, qos: int, handler):
         """
-        注册某个 Topic 的回调函数
+        注册某个 Topic 的回调函数，Topic 可使用通配符 + (单层) 和 # (多层)，例如 "home/+/temp"、"home/#"
 
         Args:
             topic: 主题
             qos: QoS 等级
             handler: 回调函数，接收一个参数：message
         """
-        def wrapper(*args):
-            if len(args) != 1:
-                raise TypeError("handler must accept exactly one argument")
-            return handler(*args)
-        
-        self.mqtt_sub_handlers[topic] = wrapper
+        node = self.mqtt_sub_trie
+        for level in topic.split('/'):
+            node = node[1].setdefault(level, [None, {}])
+        node[0] = handler
         self.mqtt_sub_qos[topic] = qos
         self.iot.send_at('AT+MQTTSUB=0,"{}",{}'.format(topic,qos))
 
@@ -290,7 +736,6 @@ class ESP8266_ThingSpeak:
             raise Exception("Not connected to ThingSpeak")
 
         self.iot.send_at(self.data_cmd)
-        time.sleep_ms(200)
 
     def is_connected(self):
         """